@@ -2,13 +2,22 @@ __all__ = [
     "load_physio",
     "save_physio",
     "load_history",
+    "load_histories",
     "save_history",
     "Physio",
+    "PhysioSet",
     "__version__",
 ]
 
-from physutils.io import load_history, load_physio, save_history, save_physio
+from physutils.io import (
+    load_histories,
+    load_history,
+    load_physio,
+    save_history,
+    save_physio,
+)
 from physutils.physio import Physio
+from physutils.physioset import PhysioSet
 
 from ._version import get_versions
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Functions for caching parsed physiological data on disk
+"""
+
+import hashlib
+import json
+import os
+import os.path as op
+import shutil
+
+import numpy as np
+from loguru import logger
+
+from physutils.utils import make_temp_path, save_npy_atomic
+
+CACHE_MAX_SIZE = 2 * 1024**3
+SOURCE_FILE = "source.json"
+STEP_FILE = "step.phys"
+SUPPDATA_FILE = "suppdata.npy"
+
+
+def _get_source_info(fname):
+    """
+    Returns the information identifying the current version of `fname`
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to source file
+
+    Returns
+    -------
+    info : dict
+        Absolute path, size and modification time of `fname`
+    """
+    stat = os.stat(fname)
+    return dict(
+        path=op.abspath(os.fspath(fname)), size=stat.st_size, mtime=stat.st_mtime_ns
+    )
+
+
+def _get_entry_dir(cache_dir, fname):
+    """
+    Returns the cache entry directory of source file `fname`
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    fname : str or os.PathLike
+        Path to source file
+
+    Returns
+    -------
+    entry_dir : str
+        Path to the directory holding the cached data of `fname`
+    """
+    key = hashlib.sha1(op.abspath(os.fspath(fname)).encode()).hexdigest()
+    return op.join(os.fspath(cache_dir), key)
+
+
+def _get_entry_size(entry_dir):
+    """
+    Returns the total size in bytes of the files in `entry_dir`
+    """
+    return sum(
+        entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file()
+    )
+
+
+def load_cached_columns(cache_dir, fname, columns):
+    """
+    Loads cached `columns` of `fname` from `cache_dir` as memory-mapped arrays
+
+    Cache entries are invalidated (and removed) if the size or modification
+    time of `fname` changed since they were written.
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    fname : str or os.PathLike
+        Path to source file
+    columns : list of int
+        Indices of the columns to load
+
+    Returns
+    -------
+    cached : dict
+        Read-only memory-mapped arrays of the cached columns, keyed by column
+        index. Columns that are not cached are missing from the dictionary.
+    """
+    entry_dir = _get_entry_dir(cache_dir, fname)
+    source_file = op.join(entry_dir, SOURCE_FILE)
+    if not op.isfile(source_file):
+        return {}
+
+    with open(source_file, "r") as src:
+        source = json.load(src)
+    if source != _get_source_info(fname):
+        logger.debug(f"Cached data of {fname} is out of date; removing it")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return {}
+
+    cached = {}
+    for col in columns:
+        col_file = op.join(entry_dir, f"{col}.npy")
+        if op.isfile(col_file):
+            cached[col] = np.load(col_file, mmap_mode="r")
+    # mark entry as recently used
+    os.utime(source_file)
+    logger.debug(f"Loaded columns {list(cached)} of {fname} from {entry_dir}")
+
+    return cached
+
+
+def save_cached_columns(cache_dir, fname, columns, max_size=None):
+    """
+    Saves `columns` of `fname` in `cache_dir`, evicting old entries if needed
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    fname : str or os.PathLike
+        Path to source file
+    columns : dict
+        1D arrays to be cached, keyed by column index
+    max_size : int, optional
+        Maximum size of the cache, in bytes. Default: `CACHE_MAX_SIZE`
+    """
+    entry_dir = _get_entry_dir(cache_dir, fname)
+    os.makedirs(entry_dir, exist_ok=True)
+    for col, data in columns.items():
+        save_npy_atomic(op.join(entry_dir, f"{col}.npy"), np.ascontiguousarray(data))
+    with open(op.join(entry_dir, SOURCE_FILE), "w") as dest:
+        json.dump(_get_source_info(fname), dest)
+    logger.debug(f"Cached columns {list(columns)} of {fname} in {entry_dir}")
+
+    evict(cache_dir, max_size=max_size)
+
+
+def load_cached_step(cache_dir, key):
+    """
+    Loads the Physio object cached under `key` in `cache_dir`
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    key : str
+        Key of the cached step (see :func:`physutils.io.load_history`)
+
+    Returns
+    -------
+    data : :class:`physutils.Physio` or None
+        Cached Physio object, or None if `key` is not cached
+    """
+    from physutils import io, physio
+
+    entry_dir = op.join(os.fspath(cache_dir), key)
+    source_file = op.join(entry_dir, SOURCE_FILE)
+    if not op.isfile(source_file):
+        return None
+
+    try:
+        with open(source_file, "r") as src:
+            info = json.load(src)
+        inp = io._read_phys(op.join(entry_dir, STEP_FILE))
+        suppdata_file = op.join(entry_dir, SUPPDATA_FILE)
+        if op.isfile(suppdata_file):
+            inp["suppdata"] = np.load(suppdata_file)
+    except (OSError, ValueError) as err:
+        logger.debug(f"Cannot read cached step {entry_dir} ({err}); removing it")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+    data = physio.Physio(**inp, physio_type=info["physio_type"], label=info["label"])
+    data._computed_metrics = info["computed_metrics"]
+    # mark entry as recently used
+    os.utime(source_file)
+    logger.debug(f"Loaded cached step {info['function']} from {entry_dir}")
+
+    return data
+
+
+def save_cached_step(cache_dir, key, data, function=None, max_size=None):
+    """
+    Saves Physio object `data` under `key` in `cache_dir`, evicting old entries
+
+    Steps whose history, metadata or computed metrics cannot be stored as
+    JSON are not cached.
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    key : str
+        Key of the cached step (see :func:`physutils.io.load_history`)
+    data : :class:`physutils.Physio`
+        Output of the step
+    function : str, optional
+        Name of the function run in the step, for logging. Default: None
+    max_size : int, optional
+        Maximum size of the cache, in bytes. Default: `CACHE_MAX_SIZE`
+
+    Returns
+    -------
+    cached : bool
+        Whether `data` was cached
+    """
+    from physutils import io
+
+    info = dict(
+        function=function,
+        label=data.label,
+        physio_type=data.physio_type,
+        computed_metrics=data.computed_metrics,
+    )
+    metadata = {
+        k: v
+        for k, v in data._metadata.items()
+        if not (isinstance(v, np.ndarray) and np.issubdtype(v.dtype, np.number))
+    }
+    suppdata = data.suppdata
+    try:
+        json.dumps(info)
+        json.dumps([list(data.history), metadata], default=io._json_default)
+    except TypeError as err:
+        logger.debug(f"Not caching step {function}, as it is not serializable ({err})")
+        return False
+    if suppdata is not None and np.asarray(suppdata).dtype.hasobject:
+        logger.debug(f"Not caching step {function}, as its suppdata holds objects")
+        return False
+
+    # write to a temporary directory first, replacing the entry atomically
+    entry_dir = op.join(os.fspath(cache_dir), key)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = make_temp_path(entry_dir, directory=True)
+    io.save_physio(op.join(tmp_dir, STEP_FILE), data, compression=False)
+    if suppdata is not None:
+        np.save(op.join(tmp_dir, SUPPDATA_FILE), np.asarray(suppdata))
+    with open(op.join(tmp_dir, SOURCE_FILE), "w") as dest:
+        json.dump(info, dest)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    logger.debug(f"Cached step {function} in {entry_dir}")
+
+    evict(cache_dir, max_size=max_size)
+    return True
+
+
+def evict(cache_dir, max_size=None):
+    """
+    Removes least recently used entries until `cache_dir` fits in `max_size`
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    max_size : int, optional
+        Maximum size of the cache, in bytes. Default: `CACHE_MAX_SIZE`
+
+    Returns
+    -------
+    evicted : list of str
+        Removed entry directories
+    """
+    max_size = CACHE_MAX_SIZE if max_size is None else max_size
+    entries = []
+    for entry in os.scandir(cache_dir):
+        source_file = op.join(entry.path, SOURCE_FILE)
+        if entry.is_dir() and op.isfile(source_file):
+            entries.append(
+                (
+                    os.stat(source_file).st_mtime_ns,
+                    entry.path,
+                    _get_entry_size(entry.path),
+                )
+            )
+
+    evicted = []
+    total = sum(size for _, _, size in entries)
+    for _, entry_dir, size in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        evicted.append(entry_dir)
+    if len(evicted) > 0:
+        logger.debug(f"Evicted {len(evicted)} entries from cache {cache_dir}")
+
+    return evicted
+
+
+def clear_cache(cache_dir):
+    """
+    Removes all cached data from `cache_dir`
+
+    Parameters
+    ----------
+    cache_dir : str or os.PathLike
+        Path to cache directory
+    """
+    if not op.isdir(cache_dir):
+        return
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and op.isfile(op.join(entry.path, SOURCE_FILE)):
+            shutil.rmtree(entry.path, ignore_errors=True)
+    logger.info(f"Cleared cache {cache_dir}")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Sorted array of event indices (e.g., peaks and troughs) with fast edits
+"""
+
+import numpy as np
+
+
+def _preserves_order(key):
+    """Whether indexing an array with `key` keeps its elements in order."""
+    if key is Ellipsis:
+        return True
+    if isinstance(key, slice):
+        return key.step is None or key.step > 0
+    return np.asarray(key).dtype == bool
+
+
+class EventIndex(np.ndarray):
+    """
+    Read-only, sorted array of unique event indices
+
+    Positions are found by binary search (:func:`numpy.searchsorted`), so
+    membership tests and range queries take O(log n) and edits only need one
+    O(n) copy, instead of a full scan of the array. Editing methods return a
+    new `EventIndex`, leaving the original untouched.
+
+    Results of numpy operations and of indexing that may not preserve order
+    are returned as plain :obj:`numpy.ndarray`.
+
+    Parameters
+    ----------
+    indices : array_like
+        Event indices. They are sorted and deduplicated, if needed.
+    """
+
+    def __new__(cls, indices=()):
+        indices = np.asarray(indices)
+        if indices.size == 0:
+            indices = np.empty(0, dtype=int)
+        elif not np.issubdtype(indices.dtype, np.integer):
+            indices = indices.astype(int)
+        indices = indices.ravel()
+        if np.any(indices[1:] <= indices[:-1]):
+            indices = np.unique(indices)
+        else:
+            indices = indices.copy()
+        return cls._from_sorted(indices)
+
+    @classmethod
+    def _from_sorted(cls, indices):
+        """Makes index from sorted, unique `indices`, without copying them."""
+        obj = indices.view(cls)
+        obj.flags.writeable = False
+        return obj
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        if return_scalar:
+            return array[()]
+        return array.view(np.ndarray)
+
+    def __getitem__(self, key):
+        out = super().__getitem__(key)
+        if isinstance(out, EventIndex) and not _preserves_order(key):
+            out = out.view(np.ndarray)
+        return out
+
+    def __contains__(self, value):
+        pos = np.searchsorted(self, value)
+        return bool(pos < self.size and self.view(np.ndarray)[pos] == value)
+
+    def __reduce__(self):
+        return (EventIndex, (self.view(np.ndarray),))
+
+    def contains(self, values):
+        """
+        Tests which of `values` are in the index
+
+        Parameters
+        ----------
+        values : array_like
+            Event indices to look for
+
+        Returns
+        -------
+        found : :obj:`numpy.ndarray`
+            Boolean array with the shape of `values`
+        """
+        base = self.view(np.ndarray)
+        values = np.asarray(values)
+        if base.size == 0:
+            return np.zeros(values.shape, dtype=bool)
+        pos = np.searchsorted(base, values).clip(max=base.size - 1)
+        return base[pos] == values
+
+    def between(self, start=None, stop=None):
+        """
+        Returns the events `start <= index < stop`, as a view of the index
+
+        Parameters
+        ----------
+        start : int, optional
+            First index of the range. Default: None (start of the index)
+        stop : int, optional
+            Index after the end of the range. Default: None (end of the index)
+
+        Returns
+        -------
+        events : :class:`EventIndex`
+            Events in the requested range
+        """
+        lo = 0 if start is None else np.searchsorted(self, start, side="left")
+        hi = self.size if stop is None else np.searchsorted(self, stop, side="left")
+        return self[lo:hi]
+
+    def insert(self, values):
+        """
+        Returns a copy of the index with `values` added
+
+        Parameters
+        ----------
+        values : int or array_like
+            Event indices to add. Values already in the index are ignored.
+
+        Returns
+        -------
+        events : :class:`EventIndex`
+            Updated index
+        """
+        return self.update(add=values)
+
+    def remove(self, values):
+        """
+        Returns a copy of the index without `values`
+
+        Parameters
+        ----------
+        values : int or array_like
+            Event indices to remove. Values not in the index are ignored.
+
+        Returns
+        -------
+        events : :class:`EventIndex`
+            Updated index
+        """
+        return self.update(remove=values)
+
+    def update(self, add=None, remove=None):
+        """
+        Returns a copy of the index with `add` added and `remove` removed
+
+        Both edits are applied with a single copy of the index.
+
+        Parameters
+        ----------
+        add : int or array_like, optional
+            Event indices to add. Default: None
+        remove : int or array_like, optional
+            Event indices to remove. Applied after `add`. Default: None
+
+        Returns
+        -------
+        events : :class:`EventIndex`
+            Updated index
+        """
+        base = self.view(np.ndarray)
+        if add is not None:
+            add = np.unique(np.asarray(add, dtype=base.dtype))
+            add = add[~self.contains(add)]
+            base = np.insert(base, np.searchsorted(base, add), add)
+        if remove is not None and base.size > 0:
+            remove = np.unique(np.asarray(remove, dtype=base.dtype))
+            pos = np.searchsorted(base, remove).clip(max=base.size - 1)
+            base = np.delete(base, pos[base[pos] == remove])
+        return EventIndex._from_sorted(base)
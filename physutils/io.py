@@ -3,17 +3,124 @@
 Functions for loading and saving data and analyses
 """
 
+import hashlib
 import importlib
+import inspect
 import json
 import os
 import os.path as op
+import struct
+import time
+import zipfile
+from contextlib import contextmanager
+from functools import partial
 
 import numpy as np
 from loguru import logger
 
-from physutils import physio
+from physutils import cache, physio
+from physutils.utils import get_bids_layout, iter_completed
 
 EXPECTED = ["data", "fs", "history", "metadata"]
+# alignment of arrays stored uncompressed in .phys files, as for npy headers
+PHYS_ALIGN = 64
+# zip extra field ID used for alignment padding, as by Android's zipalign
+ZIP_ALIGN_EXTRA_ID = 0xD935
+PHYS_FORMAT_VERSION = 3
+CODECS = ["lz4", "zstd"]
+MEMORY_POLICIES = ["copy", "view"]
+# modes that never truncate the file, unlike "w+"
+MMAP_MODES = [None, "r", "r+", "c"]
+
+
+def _load_tsv(fname, usecols=None):
+    """
+    Loads the columns of a (gzipped) tab-delimited numeric table
+
+    The table is parsed with the multi-threaded CSV reader of pyarrow if it is
+    installed, and with :func:`numpy.loadtxt` otherwise (or if pyarrow cannot
+    parse it, e.g., if it is delimited by spaces).
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to .tsv or .tsv.gz file
+    usecols : list of int, optional
+        Indices of the columns to load; the others are never kept in memory.
+        Default: None (all)
+
+    Returns
+    -------
+    columns : list of (N,) :obj:`numpy.ndarray`
+        Loaded columns, as many as `usecols` if provided. Columns read with
+        pyarrow are separate arrays; those read with numpy are strided views
+        of the loaded (N, C) table.
+    """
+    fname = os.fspath(fname)
+    try:
+        from pyarrow import csv
+    except ImportError:
+        csv = None
+
+    if csv is not None:
+        logger.debug(f"Reading {fname} with pyarrow")
+        try:
+            table = csv.read_csv(
+                fname,
+                read_options=csv.ReadOptions(autogenerate_column_names=True),
+                parse_options=csv.ParseOptions(delimiter="\t"),
+                convert_options=csv.ConvertOptions(
+                    include_columns=(
+                        None if usecols is None else [f"f{idx}" for idx in usecols]
+                    )
+                ),
+            )
+            # copy each column into its own array, chunk by chunk, so that
+            # the columns need no further copy to be contiguous
+            columns = []
+            for column in table.columns:
+                columns.append(np.empty(len(column)))
+                start = 0
+                for chunk in column.chunks:
+                    stop = start + len(chunk)
+                    columns[-1][start:stop] = chunk.to_numpy(zero_copy_only=False)
+                    start = stop
+            return columns
+        except (TypeError, ValueError) as err:
+            logger.debug(f"Failed to read {fname} with pyarrow ({err})")
+
+    logger.debug(f"Reading {fname} with numpy.loadtxt")
+    return list(np.loadtxt(fname, usecols=usecols, ndmin=2).T)
+
+
+def _get_physio_type(col):
+    """
+    Guesses the physiological signal type of BIDS column `col` from its name
+
+    Parameters
+    ----------
+    col : str
+        Column name
+
+    Returns
+    -------
+    physio_type : {'cardiac', 'respiratory', 'trigger', 'time', None}
+        Guessed signal type, or None if it cannot be determined
+    """
+    if any([x in col.lower() for x in ["cardiac", "ppg", "ecg", "card", "pulse"]]):
+        return "cardiac"
+    elif any(
+        [
+            x in col.lower()
+            for x in ["respiratory", "rsp", "resp", "breath", "co2", "o2"]
+        ]
+    ):
+        return "respiratory"
+    elif any([x in col.lower() for x in ["trigger", "tr"]]):
+        return "trigger"
+    elif any([x in col.lower() for x in ["time"]]):
+        return "time"
+    return None
 
 
 def load_from_bids(
@@ -25,6 +132,12 @@ def load_from_bids(
     recording=None,
     extension="tsv.gz",
     suffix="physio",
+    columns=None,
+    physio_types=None,
+    cache_dir=None,
+    layout=None,
+    as_set=False,
+    memory="copy",
 ):
     """
     Load physiological data from BIDS-formatted directory.
@@ -43,25 +156,43 @@ def load_from_bids(
         Run identifier
     suffix : str
         Suffix of file to load
+    columns : list of str, optional
+        Names of the columns (as listed in the sidecar `Columns`) to load.
+        Other columns are not kept in memory. Default: None (all)
+    physio_types : list of {'cardiac', 'respiratory', 'trigger'}, optional
+        Only load columns of these signal types. Default: None (all)
+    cache_dir : str or os.PathLike, optional
+        Directory in which to cache the parsed columns as .npy files, which
+        are memory-mapped on subsequent loads of the same (unmodified) file.
+        See :mod:`physutils.cache`. Default: None (no caching)
+    layout : :class:`bids.BIDSLayout`, optional
+        Prebuilt index of `bids_path`. If not provided, the layout cached by
+        :func:`physutils.utils.get_bids_layout` is used. Default: None
+    as_set : bool, optional
+        Whether to return the columns as one :class:`physutils.PhysioSet`,
+        holding them in a single contiguous array, instead of a dictionary of
+        :class:`physutils.Physio` objects. Default: False
+    memory : {'copy', 'view'}, optional
+        How the Physio objects hold the data of each column. 'copy' copies
+        each loaded column into its own contiguous array, so that the parsed
+        table is released and unused columns free their memory; 'view' keeps
+        views of the parsed table, avoiding the copies but keeping the whole
+        table in memory as long as any of the objects. Columns memory-mapped
+        from `cache_dir`, or parsed into separate arrays (with pyarrow), are
+        never copied, and a PhysioSet always holds a copy. Default: 'copy'
 
     Returns
     -------
-    data : :class:`physutils.Physio`
-        Loaded physiological data
+    data : dict or :class:`physutils.PhysioSet`
+        Loaded physiological data, as :class:`physutils.Physio` objects keyed
+        by column name, or as one PhysioSet if `as_set`
     """
-    try:
-        from bids import BIDSLayout
-    except ImportError:
-        raise ImportError(
-            "To use BIDS-based feature, pybids must be installed. Install manually or with `pip install physutils[bids]`"
-        )
-
     # check if file exists and is in BIDS format
     if not op.exists(bids_path):
         raise FileNotFoundError(f"Provided path {bids_path} does not exist")
+    _check_memory_policy(memory)
 
-    layout = BIDSLayout(bids_path, validate=False)
-    bids_file = layout.get(
+    entities = dict(
         subject=subject,
         session=session,
         task=task,
@@ -70,6 +201,10 @@ def load_from_bids(
         extension=extension,
         recording=recording,
     )
+    if layout is not None:
+        bids_file = layout.get(**entities)
+    else:
+        bids_file = get_bids_layout(bids_path).get(**entities)
     logger.debug(f"BIDS file found: {bids_file}")
     if len(bids_file) == 0:
         raise FileNotFoundError(
@@ -80,67 +215,660 @@ def load_from_bids(
             f"Multiple files found for subject {subject}, session {session}, task {task}, run {run}, recording {recording}"
         )
 
-    config_file = bids_file[0].get_metadata()
+    return _load_bids_physio(
+        bids_file[0].path,
+        bids_file[0].get_metadata(),
+        history=physio._get_call(exclude=["layout"]),
+        columns=columns,
+        physio_types=physio_types,
+        cache_dir=cache_dir,
+        as_set=as_set,
+        memory=memory,
+    )
+
+
+def _check_memory_policy(memory):
+    """Raises ValueError if `memory` is not a supported memory policy."""
+    if memory not in MEMORY_POLICIES:
+        raise ValueError(
+            f"Provided memory policy {memory} is not supported; must be in "
+            f"{MEMORY_POLICIES}"
+        )
+
+
+def _load_bids_physio(
+    fname,
+    config_file,
+    history,
+    columns=None,
+    physio_types=None,
+    cache_dir=None,
+    as_set=False,
+    memory="copy",
+):
+    """
+    Loads the columns of BIDS physio file `fname` into Physio objects
+
+    Parameters
+    ----------
+    fname : str
+        Path to the _physio.tsv(.gz) file
+    config_file : dict
+        Sidecar metadata of `fname`
+    history : tuple
+        History entry of the call that loaded `fname`
+    columns, physio_types, cache_dir, as_set, memory : optional
+        See :func:`load_from_bids`
+
+    Returns
+    -------
+    physio_objects : dict or :class:`physutils.PhysioSet`
+        Loaded :class:`physutils.Physio` objects, keyed by column name, or
+        PhysioSet if `as_set`
+    """
     fs = config_file["SamplingFrequency"]
     t_start = config_file["StartTime"] if "StartTime" in config_file else 0
-    columns = config_file["Columns"]
-    logger.debug(f"Loaded structure contains columns: {columns}")
+    file_columns = config_file["Columns"]
+    logger.debug(f"Loaded structure contains columns: {file_columns}")
+
+    if columns is not None:
+        missing = [col for col in columns if col not in file_columns]
+        if len(missing) > 0:
+            raise ValueError(
+                f"Requested columns {missing} are not in the file columns {file_columns}"
+            )
+    load_columns = [
+        col
+        for col in file_columns
+        if _get_physio_type(col) == "time"
+        or (
+            (columns is None or col in columns)
+            and (physio_types is None or _get_physio_type(col) in physio_types)
+        )
+    ]
+    logger.debug(f"Loading columns: {load_columns}")
 
     physio_objects = {}
-    data = np.loadtxt(bids_file[0].path)
+    usecols = [file_columns.index(col) for col in load_columns]
+    data = {}
+    if cache_dir is not None:
+        data = cache.load_cached_columns(cache_dir, fname, usecols)
+    parse_cols = [idx for idx in usecols if idx not in data]
+    if len(parse_cols) > 0:
+        parsed = _load_tsv(fname, usecols=parse_cols)
+        parsed = dict(zip(parse_cols, parsed))
+        if cache_dir is not None:
+            cache.save_cached_columns(cache_dir, fname, parsed)
+        data.update(parsed)
 
-    if "time" in columns:
-        idx_0 = np.argmax(data[:, columns.index("time")] >= t_start)
+    if "time" in load_columns:
+        idx_0 = np.argmax(data[file_columns.index("time")] >= t_start)
     else:
         idx_0 = 0
         logger.warning(
             "No time column found in file. Assuming data starts at the beginning of the file"
         )
 
-    for col in columns:
-        col_physio_type = None
-        if any([x in col.lower() for x in ["cardiac", "ppg", "ecg", "card", "pulse"]]):
-            col_physio_type = "cardiac"
-        elif any(
-            [
-                x in col.lower()
-                for x in ["respiratory", "rsp", "resp", "breath", "co2", "o2"]
-            ]
-        ):
-            col_physio_type = "respiratory"
-        elif any([x in col.lower() for x in ["trigger", "tr"]]):
-            col_physio_type = "trigger"
-        elif any([x in col.lower() for x in ["time"]]):
+    if as_set:
+        return _make_bids_physioset(
+            fname, data, file_columns, load_columns, idx_0, fs, history
+        )
+
+    for col in load_columns:
+        col_physio_type = _get_physio_type(col)
+        if col_physio_type == "time":
             continue
-        else:
+        elif col_physio_type is None:
             logger.warning(
                 f"Column {col}'s type cannot be determined. Additional features may be missing."
             )
 
+        # columns parsed with numpy are strided views of the table: copy
+        # them, so that the table is released once loaded
+        column = data[file_columns.index(col)][idx_0:]
+        if memory == "copy" and not (
+            isinstance(column, np.memmap) or column.flags.c_contiguous
+        ):
+            column = column.copy()
+
         if col_physio_type in ["cardiac", "respiratory"]:
             physio_objects[col] = physio.Physio(
-                data[idx_0:, columns.index(col)],
+                column,
                 fs=fs,
-                history=[physio._get_call(exclude=[])],
+                history=[history],
             )
             physio_objects[col]._physio_type = col_physio_type
             physio_objects[col]._label = (
-                bids_file[0].filename.split(".")[0].replace("_physio", "")
+                op.basename(fname).split(".")[0].replace("_physio", "")
             )
 
         if col_physio_type == "trigger":
             # TODO: Implement trigger loading using the MRI data object
             logger.warning("MRI trigger characteristics extraction not yet implemented")
             physio_objects[col] = physio.Physio(
-                data[idx_0:, columns.index(col)],
+                column,
                 fs=fs,
-                history=[physio._get_call(exclude=[])],
+                history=[history],
             )
 
     return physio_objects
 
 
-def load_physio(data, *, fs=None, dtype=None, history=None, allow_pickle=False):
+def _make_bids_physioset(fname, data, file_columns, load_columns, idx_0, fs, history):
+    """
+    Stacks the columns of BIDS physio file `fname` into a PhysioSet
+
+    Parameters
+    ----------
+    fname : str
+        Path to the _physio.tsv(.gz) file
+    data : dict
+        Loaded columns, keyed by column index in `file_columns`
+    file_columns, load_columns : list of str
+        Names of the columns in the file, and of the loaded columns
+    idx_0 : int
+        Index of the first sample to keep
+    fs : float
+        Sampling rate of the data
+    history : tuple
+        History entry of the call that loaded `fname`
+
+    Returns
+    -------
+    physioset : :class:`physutils.PhysioSet`
+        Loaded data, with one channel per loaded (non-time) column. Empty if
+        no column is loaded.
+    """
+    from physutils.physioset import PhysioSet
+
+    # keep the same columns as when loading them into separate Physio objects
+    channels = []
+    for col in load_columns:
+        col_physio_type = _get_physio_type(col)
+        if col_physio_type is None:
+            logger.warning(
+                f"Column {col}'s type cannot be determined. Additional features may be missing."
+            )
+        elif col_physio_type != "time":
+            channels.append(col)
+    columns = [data[file_columns.index(col)][idx_0:] for col in channels]
+
+    # copy columns into one contiguous array, releasing the parsed table
+    n_samples = 0
+    if len(load_columns) > 0:
+        n_samples = len(data[file_columns.index(load_columns[0])]) - idx_0
+    dtype = np.result_type(*columns) if len(columns) > 0 else np.float64
+    stacked = np.empty((len(channels), n_samples), dtype=dtype)
+    for row, column in zip(stacked, columns):
+        row[:] = column
+    physio_types = [
+        col_physio_type if col_physio_type != "trigger" else None
+        for col_physio_type in map(_get_physio_type, channels)
+    ]
+
+    return PhysioSet(
+        stacked,
+        channels,
+        fs=fs,
+        history=[history],
+        physio_types=physio_types,
+        label=op.basename(fname).split(".")[0].replace("_physio", ""),
+    )
+
+
+def load_bids_dataset(
+    bids_path,
+    *,
+    n_jobs=1,
+    use_processes=False,
+    extension="tsv.gz",
+    suffix="physio",
+    columns=None,
+    physio_types=None,
+    cache_dir=None,
+    layout=None,
+    as_set=False,
+    memory="copy",
+    **entities,
+):
+    """
+    Load all physiological recordings of a BIDS dataset matching `entities`.
+
+    Matching files are resolved with a single query of the dataset index, and
+    then loaded concurrently. Results are yielded as soon as each file is
+    loaded, and only a few files are in flight at any time, so memory use does
+    not grow with the size of the dataset.
+
+    Parameters
+    ----------
+    bids_path : str
+        Path to BIDS-formatted directory
+    n_jobs : int, optional
+        Number of files to load in parallel. Default: 1
+    use_processes : bool, optional
+        Whether to use a pool of processes instead of threads. Default: False
+    extension : str, optional
+        Extension of the files to load. Default: 'tsv.gz'
+    suffix : str, optional
+        Suffix of the files to load. Default: 'physio'
+    columns, physio_types, cache_dir, layout, as_set, memory : optional
+        See :func:`load_from_bids`
+    **entities
+        BIDS entities (e.g. `subject`, `session`, `task`) to filter files by
+
+    Yields
+    ------
+    entities : dict
+        BIDS entities of the loaded file
+    physio_objects : dict or :class:`physutils.PhysioSet`
+        Loaded :class:`physutils.Physio` objects, keyed by column name, or
+        PhysioSet if `as_set`
+    """
+    if not op.exists(bids_path):
+        raise FileNotFoundError(f"Provided path {bids_path} does not exist")
+    _check_memory_policy(memory)
+
+    bids_layout = get_bids_layout(bids_path) if layout is None else layout
+    bids_files = bids_layout.get(suffix=suffix, extension=extension, **entities)
+    logger.info(f"Loading {len(bids_files)} files from {bids_path}")
+
+    options = dict(
+        columns=columns,
+        physio_types=physio_types,
+        cache_dir=cache_dir,
+        as_set=as_set,
+        memory=memory,
+    )
+    jobs = []
+    for bids_file in bids_files:
+        file_entities = bids_file.get_entities()
+        # record each file as if it was loaded with load_from_bids
+        history = _get_bids_history(
+            bids_path,
+            **{
+                key: file_entities.get(key)
+                for key in ["subject", "session", "task", "run", "recording"]
+            },
+            extension=extension,
+            suffix=suffix,
+            **options,
+        )
+        jobs.append((file_entities, bids_file.path, bids_file.get_metadata(), history))
+
+    load = partial(_load_bids_job, **options)
+    for job, future in iter_completed(
+        load, jobs, n_jobs=n_jobs, use_processes=use_processes
+    ):
+        yield job[0], future.result()
+
+
+def _get_bids_history(*args, **kwargs):
+    """
+    Returns the history entry of ``load_from_bids(*args, **kwargs)``
+
+    The entry is derived from the signature of :func:`load_from_bids`, so
+    that it matches the one recorded by the function itself.
+    """
+    arguments = inspect.signature(load_from_bids).bind(*args, **kwargs)
+    arguments.apply_defaults()
+    provided = {
+        key: physio._to_history_value(value)
+        for key, value in sorted(arguments.arguments.items())
+        if key != "layout"
+    }
+    return f"{__name__}.{load_from_bids.__name__}", provided
+
+
+def _load_bids_job(job, **kwargs):
+    """Runs :func:`_load_bids_physio` on a job of :func:`load_bids_dataset`."""
+    _, fname, config_file, history = job
+    return _load_bids_physio(fname, config_file, history, **kwargs)
+
+
+def _read_npy_header(fp):
+    """
+    Reads the header of the .npy file open in `fp`
+
+    Parameters
+    ----------
+    fp : file-like
+        File positioned at the start of a .npy file
+
+    Returns
+    -------
+    shape : tuple
+        Shape of the array
+    fortran_order : bool
+        Whether the array is stored in Fortran order
+    dtype : :obj:`numpy.dtype`
+        Data type of the array
+    """
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(fp)
+    return np.lib.format.read_array_header_2_0(fp)
+
+
+def _mmap_npz_member(fname, name, mode="r"):
+    """
+    Memory-maps array `name` stored without compression in npz file `fname`
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to npz file
+    name : str
+        Name of the array in `fname`
+    mode : {'r', 'r+', 'c'}, optional
+        Memory-mapping mode, see :class:`numpy.memmap`. Default: 'r'
+
+    Returns
+    -------
+    array : :class:`numpy.memmap` or None
+        Memory-mapped array, or None if the array is compressed (or holds
+        Python objects) and cannot be memory-mapped
+    """
+    with zipfile.ZipFile(fname) as zf:
+        info = zf.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(fname, "rb") as src:
+        # skip the zip local file header, whose name and extra field lengths
+        # are stored at bytes 26-30
+        src.seek(info.header_offset)
+        name_len, extra_len = struct.unpack("<HH", src.read(30)[26:30])
+        src.seek(info.header_offset + 30 + name_len + extra_len)
+        shape, fortran_order, dtype = _read_npy_header(src)
+        offset = src.tell()
+    if dtype.hasobject:
+        return None
+
+    return np.memmap(
+        fname,
+        dtype=dtype,
+        mode=mode,
+        offset=offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+def _get_codec(codec):
+    """
+    Returns the compressing writer and decompressing reader of `codec`
+
+    Parameters
+    ----------
+    codec : {'lz4', 'zstd'}
+        Name of codec
+
+    Returns
+    -------
+    open_writer : callable
+        Function wrapping a writable file-like into a file-like compressing
+        the content written to it. Closing it does not close the wrapped one.
+    open_stream : callable
+        Function wrapping a file-like with compressed content into a
+        file-like with decompressed content
+    """
+    if codec == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError(
+                "To use lz4 compression, lz4 must be installed. Install manually or with `pip install physutils[compression]`"
+            )
+        return partial(lz4.frame.open, mode="wb"), partial(lz4.frame.open, mode="rb")
+    elif codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "To use zstd compression, zstandard must be installed. Install manually or with `pip install physutils[compression]`"
+            )
+        return (
+            partial(zstandard.ZstdCompressor().stream_writer, closefd=False),
+            zstandard.ZstdDecompressor().stream_reader,
+        )
+    raise ValueError(f"Codec {codec} is not supported; must be in {CODECS}")
+
+
+def _savez(dest, arrays, compression=zipfile.ZIP_STORED, level=None, codec=None):
+    """
+    Saves `arrays` in npz file `dest`, like :func:`numpy.savez`
+
+    Unlike :func:`numpy.savez_compressed`, allows choosing the zlib level, or
+    compressing the `data` array with another codec. The .npy content of
+    `data` is then streamed through the codec into its (stored) member, so
+    that no compressed or serialized copy of it is held in memory.
+
+    Parameters
+    ----------
+    dest : file-like
+        Open, seekable file
+    arrays : dict
+        Arrays to be saved, keyed by name
+    compression : {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}, optional
+        Zip compression method. Default: zipfile.ZIP_STORED
+    level : int, optional
+        zlib compression level. Default: None (zlib default)
+    codec : {'lz4', 'zstd'}, optional
+        Codec to compress the `data` array with. Default: None
+    """
+    with zipfile.ZipFile(
+        dest, mode="w", compression=compression, compresslevel=level, allowZip64=True
+    ) as zf:
+        for name, array in arrays.items():
+            member = name + ".npy"
+            if compression == zipfile.ZIP_STORED:
+                member = _aligned_zipinfo(member, dest.tell())
+            with zf.open(member, mode="w", force_zip64=True) as fp:
+                if name == "data" and codec is not None:
+                    open_writer, _ = _get_codec(codec)
+                    with open_writer(fp) as writer:
+                        np.lib.format.write_array(writer, np.asanyarray(array))
+                    continue
+                np.lib.format.write_array(fp, np.asanyarray(array), allow_pickle=True)
+
+
+def _aligned_zipinfo(name, offset):
+    """
+    Returns zip entry `name`, padded so that its data is aligned in the file
+
+    The local file header of the entry is padded with an extra field so that
+    its data, written at `offset` in the file, starts at a multiple of
+    `PHYS_ALIGN` bytes. As npy headers are padded to the same alignment,
+    arrays stored without compression can then be memory-mapped aligned.
+
+    Parameters
+    ----------
+    name : str
+        Name of the entry
+    offset : int
+        Offset in the file at which the entry will be written
+
+    Returns
+    -------
+    zinfo : :class:`zipfile.ZipInfo`
+        Entry to be opened for writing with ``force_zip64=True``
+    """
+    zinfo = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+    zinfo.external_attr = 0o600 << 16
+    # as set by ZipFile.open before writing the header
+    zinfo.CRC = zinfo.compress_size = zinfo.file_size = 0
+    padding = -(offset + len(zinfo.FileHeader(zip64=True))) % PHYS_ALIGN
+    if 0 < padding < 4:
+        # an extra field holds at least its 4 bytes of ID and size
+        padding += PHYS_ALIGN
+    if padding > 0:
+        zinfo.extra = struct.pack("<HH", ZIP_ALIGN_EXTRA_ID, padding - 4)
+        zinfo.extra += bytes(padding - 4)
+    return zinfo
+
+
+@contextmanager
+def _open_phys_data(fname, codec=None):
+    """
+    Opens the data array of .phys file `fname` as a readable .npy stream
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to .phys file
+    codec : str, optional
+        Codec `data` was compressed with, if any. Default: None
+
+    Yields
+    ------
+    fp : file-like
+        Stream positioned at the start of the .npy content of `data`
+    """
+    with zipfile.ZipFile(fname) as zf, zf.open("data.npy") as fp:
+        if codec in CODECS:
+            # the member holds a compressed .npy file, wrapped in a uint8 array
+            # in files of format version 2
+            if fp.peek(len(np.lib.format.MAGIC_PREFIX)).startswith(
+                np.lib.format.MAGIC_PREFIX
+            ):
+                _read_npy_header(fp)
+            _, open_stream = _get_codec(codec)
+            fp = open_stream(fp)
+        yield fp
+
+
+def _load_phys_data(fname, codec=None):
+    """
+    Loads the data array of .phys file `fname`
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to .phys file
+    codec : str, optional
+        Codec `data` was compressed with, if any. Default: None
+
+    Returns
+    -------
+    data : :obj:`numpy.ndarray`
+        Physiological data
+    """
+    with _open_phys_data(fname, codec) as fp:
+        return np.lib.format.read_array(fp)
+
+
+def _json_default(obj):
+    """Makes numpy objects found in history or metadata JSON serializable."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _to_json_array(obj):
+    """Encodes `obj` as JSON, stored in an array of bytes."""
+    return np.frombuffer(json.dumps(obj, default=_json_default).encode(), np.uint8)
+
+
+def _from_json_array(array):
+    """Decodes JSON stored in an array of bytes by :func:`_to_json_array`."""
+    return json.loads(array.tobytes().decode())
+
+
+def _read_phys(fname, allow_pickle=False, mmap_mode=None, lazy=False):
+    """
+    Reads the attributes of a .phys file made with :func:`save_physio`
+
+    Files in the current format store history and non-array metadata as JSON,
+    and peaks, troughs and rejected peaks as integer arrays, so they can be
+    read without unpickling. Files in the legacy format (without a
+    `format_version` array) store them as pickled objects, and need
+    `allow_pickle`.
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to .phys file
+    allow_pickle, mmap_mode, lazy : optional
+        See :func:`load_physio`
+
+    Returns
+    -------
+    inp : dict
+        Keyword arguments to instantiate a :class:`physutils.Physio`
+
+    Raises
+    ------
+    ValueError
+        If `fname` is not an npz file, or misses some of the `EXPECTED` arrays
+    """
+    with np.load(fname, allow_pickle=allow_pickle) as src:
+        if any([attr not in src.files for attr in EXPECTED]):
+            raise ValueError(
+                "Provided npz file {} must have all of "
+                "the following attributes: {}".format(fname, EXPECTED)
+            )
+        # files saved before `compression` was recorded are zlib compressed
+        codec = src["compression"].item() if "compression" in src.files else None
+        if "format_version" in src.files:
+            version = src["format_version"].item()
+            if version > PHYS_FORMAT_VERSION:
+                raise NotImplementedError(
+                    f"{fname} was saved in .phys format version {version}, but "
+                    f"only versions up to {PHYS_FORMAT_VERSION} are supported. "
+                    "Please update physutils."
+                )
+            inp = dict(
+                fs=src["fs"].item(),
+                history=_from_json_array(src["history"]),
+                metadata=_from_json_array(src["metadata"]),
+            )
+            for name in src.files:
+                if name.startswith("metadata_"):
+                    inp["metadata"][name[len("metadata_") :]] = src[name]
+        else:
+            inp = {
+                attr: src[attr].dtype.type(src[attr])
+                for attr in EXPECTED
+                if attr != "data"
+            }
+    # fix history, which needs to be list-of-tuple
+    if inp["history"] is not None:
+        inp["history"] = list(map(tuple, inp["history"]))
+
+    inp["data"] = None
+    if mmap_mode is not None:
+        if codec not in CODECS:
+            inp["data"] = _mmap_npz_member(fname, "data", mode=mmap_mode)
+        if inp["data"] is None:
+            logger.warning(
+                f"Data in {fname} is compressed and cannot be "
+                "memory-mapped. Loading it in memory."
+            )
+    if inp["data"] is None and lazy:
+        # only read the header now, to know the data size
+        with _open_phys_data(fname, codec) as fp:
+            shape, _, dtype = _read_npy_header(fp)
+        inp["data"] = physio._LazyData(
+            partial(_load_phys_data, fname, codec), shape, dtype
+        )
+    elif inp["data"] is None:
+        inp["data"] = _load_phys_data(fname, codec)
+
+    return inp
+
+
+def load_physio(
+    data,
+    *,
+    fs=None,
+    dtype=None,
+    history=None,
+    allow_pickle=False,
+    mmap_mode=None,
+    lazy=False,
+):
     """
     Returns `Physio` object with provided data
 
@@ -157,6 +885,15 @@ def load_physio(data, *, fs=None, dtype=None, history=None, allow_pickle=False):
     allow_pickle : bool, optional
         Whether to allow loading if `data` contains pickled objects. Default:
         False
+    mmap_mode : {None, 'r', 'r+', 'c'}, optional
+        If not None, memory-map the data of a file saved with
+        ``save_physio(..., compression=False)`` instead of reading it, using
+        the given mode (see :class:`numpy.memmap`). Compressed files are read
+        in memory. Default: None
+    lazy : bool, optional
+        If `data` is a file made with :func:`save_physio`, only read its
+        sampling rate, history, metadata and data size now, and defer reading
+        (and decompressing) the data until it is first accessed. Default: False
 
     Returns
     -------
@@ -167,24 +904,22 @@ def load_physio(data, *, fs=None, dtype=None, history=None, allow_pickle=False):
     ------
     TypeError
         If provided `data` is unable to be loaded
+    ValueError
+        If `mmap_mode` is not supported
     """
 
+    if mmap_mode not in MMAP_MODES:
+        raise ValueError(
+            f"Provided mmap_mode {mmap_mode} is not supported; must be in {MMAP_MODES}"
+        )
+
     # first check if the file was made with `save_physio`; otherwise, try to
     # load it as a plain text file and instantiate a history
     if isinstance(data, str) or isinstance(data, os.PathLike):
         try:
-            inp = dict(np.load(data, allow_pickle=allow_pickle))
-            for attr in EXPECTED:
-                try:
-                    inp[attr] = inp[attr].dtype.type(inp[attr])
-                except KeyError:
-                    raise ValueError(
-                        "Provided npz file {} must have all of "
-                        "the following attributes: {}".format(data, EXPECTED)
-                    )
-            # fix history, which needs to be list-of-tuple
-            if inp["history"] is not None:
-                inp["history"] = list(map(tuple, inp["history"]))
+            inp = _read_phys(
+                data, allow_pickle=allow_pickle, mmap_mode=mmap_mode, lazy=lazy
+            )
         except (IOError, OSError, ValueError):
             inp = dict(data=np.loadtxt(data), history=[physio._get_call(exclude=[])])
         logger.debug("Instantiating Physio object from a file")
@@ -224,7 +959,7 @@ def load_physio(data, *, fs=None, dtype=None, history=None, allow_pickle=False):
     return phys
 
 
-def save_physio(fname, data):
+def save_physio(fname, data, *, compression=True):
     """
     Saves `data` to `fname`
 
@@ -234,6 +969,14 @@ def save_physio(fname, data):
         Path to output file; .phys will be appended if necessary
     data : Physio_like
         Data to be saved to file
+    compression : bool, int or {'zlib', 'lz4', 'zstd'}, optional
+        How to compress the saved arrays. False saves them uncompressed, so
+        that they can be memory-mapped with ``load_physio(..., mmap_mode='r')``;
+        True or 'zlib' uses zlib compression, with default level; an int
+        between 0 and 9 uses zlib with that level. 'lz4' and 'zstd' compress
+        `data` with these (much faster) codecs, if the lz4 or zstandard
+        packages are installed. The choice is saved in the file, and
+        :func:`load_physio` reads any of them. Default: True
 
     Returns
     -------
@@ -244,27 +987,84 @@ def save_physio(fname, data):
     from physutils.physio import check_physio
 
     data = check_physio(data)
+    arrays = dict(
+        data=data.data, fs=data.fs, format_version=np.array(PHYS_FORMAT_VERSION)
+    )
+    metadata = {}
+    for key, value in data._metadata.items():
+        if isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.number):
+            arrays["metadata_" + key] = value
+        else:
+            metadata[key] = value
+    try:
+        arrays["history"] = _to_json_array(list(data.history))
+        arrays["metadata"] = _to_json_array(metadata)
+    except TypeError as err:
+        logger.warning(
+            f"History or metadata of {data} cannot be saved as JSON ({err}). "
+            "Saving it in the legacy format, which requires allow_pickle=True "
+            "to be loaded."
+        )
+        hist = list(data.history) if data.history != [] else None
+        arrays = dict(data=data.data, fs=data.fs, history=hist, metadata=data._metadata)
+    level = None
+    if compression is True or compression == "zlib":
+        method = "zlib"
+    elif compression is False or compression is None or compression == "none":
+        method = "none"
+    elif isinstance(compression, int) and 0 <= compression <= 9:
+        method, level = "zlib", compression
+    elif compression in CODECS:
+        method = compression
+        # fail before creating the file if the codec is not installed
+        _get_codec(method)
+    else:
+        raise ValueError(
+            f"Provided compression {compression} is not supported; must be a "
+            f"bool, a zlib level between 0 and 9, or in {['zlib'] + CODECS}"
+        )
+    arrays["compression"] = np.array(method)
+
     fname += ".phys" if not fname.endswith(".phys") else ""
     with open(fname, "wb") as dest:
-        hist = data.history if data.history != [] else None
-        np.savez_compressed(
-            dest, data=data.data, fs=data.fs, history=hist, metadata=data._metadata
+        _savez(
+            dest,
+            arrays,
+            compression=(
+                zipfile.ZIP_DEFLATED if method == "zlib" else zipfile.ZIP_STORED
+            ),
+            level=level,
+            codec=method if method in CODECS else None,
         )
     logger.info(f"Saved {data} in {fname}")
 
     return fname
 
 
-def load_history(file, verbose=False):
+def load_history(file, verbose=False, store_dir=None, cache_dir=None):
     """
     Loads history from `file` and replays it, creating new Physio instance
 
+    If `cache_dir` is provided, the output of every step is cached on disk,
+    keyed on the function, its arguments, the previous steps and the size and
+    modification time of the files they read. Replay then resumes from the
+    longest cached part of the history, so that only the steps that changed
+    are rerun.
+
     Parameters
     ----------
     file : str
         Path to input JSON file
     verbose : bool, optional
         Whether to print messages as history is being replayed. Default: False
+    store_dir : str or os.PathLike, optional
+        Path to the store holding large array arguments recorded in history
+        (see :func:`physutils.physio.set_history_store`). Default: None (use
+        the store currently set)
+    cache_dir : str or os.PathLike, optional
+        Path to directory where to cache replayed steps. Least recently used
+        steps are removed when the cache grows over
+        :obj:`physutils.cache.CACHE_MAX_SIZE`. Default: None (no cache)
 
     Returns
     -------
@@ -272,6 +1072,18 @@ def load_history(file, verbose=False):
         Full filepath to saved output
     """
 
+    _import_replay_packages()
+
+    return _replay_history(file, verbose, store_dir, cache_dir)
+
+
+def _import_replay_packages():
+    """
+    Imports the packages whose functions are usually found in history
+
+    Warns if peakdet or phys2denoise are not installed.
+    """
+
     # import inside function for safety!
     # we'll likely be replaying some functions from within this module...
 
@@ -302,22 +1114,45 @@ def load_history(file, verbose=False):
             "Note that loading history that uses those modules will not be possible"
         )
 
+
+def _replay_history(file, verbose=False, store_dir=None, cache_dir=None):
+    """
+    Replays history from `file`; see :func:`load_history`.
+    """
+
     # grab history from provided JSON file
     with open(file, "r") as src:
         history = json.load(src)
 
+    # find the longest part of history that was already replayed, if cached
+    start, data = 0, None
+    if cache_dir is not None:
+        keys = _get_step_keys(history)
+        for step in range(len(history), 0, -1):
+            data = cache.load_cached_step(cache_dir, keys[step - 1])
+            if data is not None:
+                start = step
+                logger.info(f"Resuming replay of {file} from step {step}")
+                break
+
     # replay history from beginning and return resultant Physio object
     logger.info(f"Replaying history from {file}")
-    data = None
-    for func, kwargs in history:
+    for step, (func_name, kwargs) in enumerate(history[start:], start):
+        kwargs = {
+            k: physio._from_history_value(v, store_dir) for k, v in kwargs.items()
+        }
         if verbose:
-            logger.info("Rerunning {}".format(func))
+            logger.info("Rerunning {}".format(func_name))
+        name_parts = func_name.split(".")
+        func = name_parts[-1]
+        module_name = ".".join(name_parts[:-1])
+        module_object = importlib.import_module(module_name)
         # loading functions don't have `data` input because it should be the
         # first thing in `history` (when the data was originally loaded!).
         # for safety, check if `data` is None; someone could have potentially
         # called load_physio on a Physio object (which is a valid, albeit
         # confusing, thing to do)
-        if "load" in func and data is None:
+        if "load" in func_name and data is None:
             if not op.exists(kwargs["data"]):
                 if kwargs["data"].startswith("/"):
                     msg = (
@@ -332,21 +1167,180 @@ def load_history(file, verbose=False):
                 raise FileNotFoundError(
                     "{} does not exist. {}".format(kwargs["data"], msg)
                 )
-            name_parts = func.split(".")
-            func = name_parts[-1]
-            module_name = ".".join(name_parts[:-1])
-            module_object = importlib.import_module(module_name)
             data = getattr(module_object, func)(**kwargs)
         else:
-            name_parts = func.split(".")
-            func = name_parts[-1]
-            module_name = ".".join(name_parts[:-1])
-            module_object = importlib.import_module(module_name)
             data = getattr(module_object, func)(data, **kwargs)
+        if cache_dir is not None and isinstance(data, physio.Physio):
+            cache.save_cached_step(cache_dir, keys[step], data, function=func_name)
 
     return data
 
 
+def _get_step_keys(history):
+    """
+    Returns the cache keys of the steps of `history`
+
+    The key of each step hashes the key of the previous step, the function
+    name and its arguments, as well as the size and modification time of any
+    file passed as argument, so that it changes whenever the step or any
+    previous one (or their input files) changes.
+
+    Parameters
+    ----------
+    history : list
+        History entries, as ``(function, arguments)`` pairs
+
+    Returns
+    -------
+    keys : list of str
+        Cache key of each step
+    """
+    keys, key = [], ""
+    for func, kwargs in history:
+        files = {
+            k: cache._get_source_info(v)
+            for k, v in kwargs.items()
+            if isinstance(v, str) and op.isfile(v)
+        }
+        step = json.dumps([key, func, kwargs, files], sort_keys=True)
+        key = hashlib.sha1(step.encode()).hexdigest()
+        keys.append(key)
+    return keys
+
+
+def load_histories(
+    files,
+    *,
+    n_jobs=1,
+    use_processes=True,
+    out_dir=None,
+    compression=True,
+    verbose=False,
+    store_dir=None,
+    cache_dir=None,
+):
+    """
+    Replays the history of many `files` in parallel
+
+    Histories are replayed in a pool of workers, each importing the packages
+    used in history (see :func:`load_history`) only once. Results are yielded
+    as soon as each file is replayed, and failures are reported without
+    stopping the batch.
+
+    Parameters
+    ----------
+    files : iterable of str
+        Paths to input JSON files
+    n_jobs : int, optional
+        Number of files to replay in parallel. Default: 1
+    use_processes : bool, optional
+        Whether to use a pool of processes instead of threads. Default: True
+    out_dir : str or os.PathLike, optional
+        Directory where to save the replayed Physio objects, as .phys files
+        named after the history files, in the same subdirectories relative to
+        the deepest directory containing all `files` (e.g., `sub-01/x.json`
+        and `sub-02/x.json` are saved to `sub-01/x.phys` and `sub-02/x.phys`).
+        If provided, the paths of the saved files are yielded instead of the
+        Physio objects, which are never sent back from the workers. Files
+        that would be saved to the same path fail with a ValueError.
+        Default: None
+    compression : optional
+        Compression of the saved files; see :func:`save_physio`. Default: True
+    verbose, store_dir, cache_dir : optional
+        See :func:`load_history`
+
+    Yields
+    ------
+    file : str
+        Path to input JSON file
+    output : :class:`physutils.Physio` or str
+        Replayed Physio object, or path to the saved .phys file if `out_dir`
+        is provided. None if replay failed
+    error : Exception
+        Exception raised while replaying `file`, or None if replay succeeded
+    """
+    jobs, n_failed = ((file, None) for file in files), 0
+    if out_dir is not None:
+        # output paths depend on all files, so gather them first
+        jobs, collisions = _get_replay_outputs(list(files), out_dir)
+        for file, error in collisions:
+            n_failed += 1
+            logger.warning(f"Failed to replay history from {file}: {error!r}")
+            yield file, None, error
+    replay = partial(
+        _replay_history_job,
+        compression=compression,
+        verbose=verbose,
+        store_dir=store_dir,
+        cache_dir=cache_dir,
+    )
+
+    for (file, _), future in iter_completed(
+        replay,
+        jobs,
+        n_jobs=n_jobs,
+        use_processes=use_processes,
+        initializer=_import_replay_packages,
+    ):
+        error = future.exception()
+        if error is not None:
+            n_failed += 1
+            logger.warning(f"Failed to replay history from {file}: {error!r}")
+            yield file, None, error
+        else:
+            yield file, future.result(), None
+    if n_failed > 0:
+        logger.warning(f"Failed to replay {n_failed} histories")
+
+
+def _get_replay_outputs(files, out_dir):
+    """
+    Returns where :func:`load_histories` saves the replay of each of `files`
+
+    Parameters
+    ----------
+    files : list of str or os.PathLike
+        Paths to input JSON files
+    out_dir : str or os.PathLike
+        Output directory
+
+    Returns
+    -------
+    jobs : list of tuple
+        Pairs of input file and path of its output (without extension)
+    collisions : list of tuple
+        Pairs of input file and ValueError, for files whose output path is
+        already used by another file
+    """
+    if len(files) == 0:
+        return [], []
+    root = op.commonpath([op.dirname(op.abspath(os.fspath(f))) for f in files])
+    jobs, collisions, used = [], [], {}
+    for file in files:
+        path = op.splitext(op.abspath(os.fspath(file)))[0]
+        fname = op.join(out_dir, op.relpath(path, root))
+        if fname in used:
+            error = ValueError(
+                f"Replay of {file} would overwrite that of {used[fname]} in "
+                f"{fname}.phys"
+            )
+            collisions.append((file, error))
+            continue
+        used[fname] = file
+        jobs.append((file, fname))
+    return jobs, collisions
+
+
+def _replay_history_job(job, compression=True, **kwargs):
+    """Runs :func:`_replay_history` on a job of :func:`load_histories`."""
+    file, fname = job
+    data = _replay_history(file, **kwargs)
+    if fname is None:
+        return data
+    os.makedirs(op.dirname(fname), exist_ok=True)
+    return save_physio(fname, data, compression=compression)
+
+
 def save_history(file, data):
     """
     Saves history of physiological `data` to `file`
@@ -377,7 +1371,7 @@ def save_history(file, data):
         )
     file += ".json" if not file.endswith(".json") else ""
     with open(file, "w") as dest:
-        json.dump(data.history, dest, indent=4)
+        json.dump(list(data.history), dest, indent=4)
     logger.info(f"Saved {data} history in {file}")
 
     return file
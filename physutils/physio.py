@@ -3,13 +3,193 @@
 Helper class for holding physiological data and associated metadata information
 """
 
+import hashlib
 import inspect
+import operator
+import os
+import os.path as op
+import sys
+from collections.abc import Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 
 import matplotlib.pyplot as plt
 import numpy as np
 from loguru import logger
 
+from . import profiling
+from .events import EventIndex
+from .utils import save_npy_atomic
+
+EVENT_KEYS = ("peaks", "troughs", "reject")
+# arrays with more elements than this are stored by reference in history
+HISTORY_ARRAY_SIZE = 1000
+ARRAY_REF_KEY = "__ndarray__"
+_HISTORY_STORE = None
+# arrays recorded by reference without a store, only warned about once
+_UNSTORED_DIGESTS = set()
+# per context (thread or task), so disabling history in one does not affect others
+_RECORD_HISTORY = ContextVar("record_history", default=True)
+
+
+def set_history_store(store_dir=None):
+    """
+    Sets directory where large array arguments recorded in history are saved
+
+    Arrays with more than `HISTORY_ARRAY_SIZE` elements are recorded in
+    history as a reference to their content hash. If a store is set, their
+    data is also saved to `store_dir`, so that the history can be replayed
+    with :func:`physutils.io.load_history`.
+
+    Parameters
+    ----------
+    store_dir : str or os.PathLike, optional
+        Path to store directory. If None, array data is not saved. Default:
+        None
+
+    Returns
+    -------
+    previous : str or None
+        Previously set store directory
+    """
+    global _HISTORY_STORE
+
+    previous = _HISTORY_STORE
+    _HISTORY_STORE = None if store_dir is None else os.fspath(store_dir)
+    return previous
+
+
+def set_record_history(enabled=True):
+    """
+    Sets whether operations are recorded in the history of Physio objects
+
+    When disabled, functions decorated with `make_operation` are called
+    directly, skipping the binding of their arguments and the update of
+    history. This is useful in tight loops where provenance is irrelevant.
+    The setting only applies to the current thread (or asyncio task).
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Whether to record operations in history. Default: True
+
+    Returns
+    -------
+    previous : bool
+        Previous setting
+    """
+    previous = _RECORD_HISTORY.get()
+    _RECORD_HISTORY.set(bool(enabled))
+    return previous
+
+
+@contextmanager
+def disable_history():
+    """
+    Context manager in which operations are not recorded in history
+
+    See `set_record_history`. The previous setting is restored on exit.
+
+    Examples
+    --------
+    >>> with disable_history():
+    ...     windows = [operation(data[i : i + 100]) for i in range(0, 1000, 100)]
+    """
+    token = _RECORD_HISTORY.set(False)
+    try:
+        yield
+    finally:
+        _RECORD_HISTORY.reset(token)
+
+
+def _to_history_value(value):
+    """
+    Coerces `value` into a JSON serializable form to be recorded in history
+
+    Large arrays are replaced by a reference to their content hash (see
+    `set_history_store`); other values with a `tolist()` method are converted
+    to lists. This is NOT foolproof, but numpy arrays tend to be the main
+    issue with function arguments.
+
+    Parameters
+    ----------
+    value : object
+        Argument value
+
+    Returns
+    -------
+    value : object
+        Serializable value
+    """
+    if (
+        isinstance(value, np.ndarray)
+        and value.size > HISTORY_ARRAY_SIZE
+        and not value.dtype.hasobject
+    ):
+        value = np.ascontiguousarray(value)
+        # hash type and shape too, so equal bytes of other arrays do not clash
+        sha = hashlib.sha1(f"{value.dtype.str}{value.shape}".encode())
+        sha.update(value.view(np.uint8).ravel())
+        digest = sha.hexdigest()
+        if _HISTORY_STORE is not None:
+            fname = op.join(_HISTORY_STORE, f"{digest}.npy")
+            if not op.isfile(fname):
+                os.makedirs(_HISTORY_STORE, exist_ok=True)
+                save_npy_atomic(fname, value)
+        elif digest not in _UNSTORED_DIGESTS:
+            _UNSTORED_DIGESTS.add(digest)
+            logger.warning(
+                f"Array argument of shape {value.shape} is recorded in history "
+                "by reference only, as no history store is set; its data will "
+                "be needed to replay the history. Use set_history_store() to "
+                "save it."
+            )
+        return {
+            ARRAY_REF_KEY: digest,
+            "dtype": value.dtype.str,
+            "shape": list(value.shape),
+        }
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+def _from_history_value(value, store_dir=None):
+    """
+    Resolves array references created by `_to_history_value`
+
+    Parameters
+    ----------
+    value : object
+        Value recorded in history
+    store_dir : str or os.PathLike, optional
+        Path to store directory. Default: directory set with
+        `set_history_store`
+
+    Returns
+    -------
+    value : object
+        `value`, or the referenced array
+
+    Raises
+    ------
+    FileNotFoundError
+        If `value` is an array reference that is not in the store
+    """
+    if not (isinstance(value, dict) and ARRAY_REF_KEY in value):
+        return value
+
+    store_dir = _HISTORY_STORE if store_dir is None else store_dir
+    digest = value[ARRAY_REF_KEY]
+    fname = None if store_dir is None else op.join(store_dir, f"{digest}.npy")
+    if fname is None or not op.isfile(fname):
+        raise FileNotFoundError(
+            f"Data of array {digest} recorded in history was not found in store "
+            f"{store_dir}. Please provide the store where it was saved."
+        )
+    return np.load(fname)
+
 
 def make_operation(*, exclude=None):
     """
@@ -27,21 +207,32 @@ def make_operation(*, exclude=None):
     """
 
     def get_call(func):
+        # exclude 'data', by default
+        ignore = ["data"] if exclude is None else exclude
+
+        # set name as the full module function name; this and the signature
+        # are constant, so they are only computed once, when decorating
+        name = inspect.getmodule(func).__name__ + "." + func.__name__
+        sig = inspect.signature(func)
+
         @wraps(func)
         def wrapper(data, *args, **kwargs):
-            # exclude 'data', by default
-            ignore = ["data"] if exclude is None else exclude
-
-            # set name as the full module function name
-            name = inspect.getmodule(func).__name__ + "." + func.__name__
-            # name = func.__name__
+            if not _RECORD_HISTORY.get():
+                return func(data, *args, **kwargs)
 
             # grab parameters from `func` by binding signature
-            sig = inspect.signature(func)
             params = sig.bind(data, *args, **kwargs).arguments
 
-            # actually run function on data
-            data = func(data, *args, **kwargs)
+            # actually run function on data, measuring it if profiling
+            profile = profiling._PROFILE.get()
+            if profile is None:
+                data = func(data, *args, **kwargs)
+            else:
+                start = profile._start()
+                try:
+                    data = func(data, *args, **kwargs)
+                finally:
+                    usage = profile._stop(start)
 
             # it shouldn't be, but don't bother appending to history if it is
             if data is None:
@@ -51,16 +242,19 @@ def make_operation(*, exclude=None):
             # attempting to coerce any numpy arrays or pandas dataframes (?!)
             # into serializable objects; this isn't foolproof but gets 80% of
             # the way there
-            provided = {k: params[k] for k in sorted(params.keys()) if k not in ignore}
-            for k, v in provided.items():
-                if hasattr(v, "tolist"):
-                    provided[k] = v.tolist()
+            provided = {
+                k: _to_history_value(params[k])
+                for k in sorted(params.keys())
+                if k not in ignore
+            }
 
             # append everything to data instance history
             if isinstance(data, tuple):
                 data[0]._history += [(name, provided)]
             else:
                 data._history += [(name, provided)]
+            if profile is not None:
+                profile._add(name, data, usage)
 
             return data
 
@@ -94,26 +288,23 @@ def _get_call(*, exclude=None, serializable=True):
     if not isinstance(exclude, list):
         exclude = [exclude]
 
-    # get one function call up the stack (the bottom is _this_ function)
-    calling = inspect.stack(0)[1]
-    frame, function = calling.frame, calling.function
+    # get one function call up the stack (the bottom is _this_ function); only
+    # the calling frame is inspected, as building the whole stack with
+    # `inspect.stack()` is slow
+    frame = sys._getframe(1)
+    code = frame.f_code
 
     # get all the args / kwargs from the calling function
-    argspec = inspect.getfullargspec(frame.f_globals[function])
-    args = sorted(argspec.args + argspec.kwonlyargs)
+    args = sorted(code.co_varnames[: code.co_argcount + code.co_kwonlyargcount])
 
     # save arguments + argument values for everything not in `exclude`
     provided = {k: frame.f_locals[k] for k in args if k not in exclude}
+    function = frame.f_globals["__name__"] + "." + code.co_name
+    del frame
 
     # if we want `provided` to be serializable, we can do a little cleaning up
-    # this is NOT foolproof, but will coerce numpy arrays to lists which tends
-    # to be the main issue with these sorts of things
     if serializable:
-        for k, v in provided.items():
-            if hasattr(v, "tolist"):
-                provided[k] = v.tolist()
-
-    function = inspect.getmodule(frame).__name__ + "." + function
+        provided = {k: _to_history_value(v) for k, v in provided.items()}
 
     return function, provided
 
@@ -128,8 +319,11 @@ def check_physio(data, ensure_fs=True, copy=False):
     ensure_fs : bool, optional
         Raise ValueError if `data` does not have a valid sampling rate
         attribute.
-    copy: bool, optional
-        Whether to return a copy of the provided data. Default: False
+    copy: bool or 'auto', optional
+        Whether to return a copy of the provided data. If 'auto', `data` is
+        copied following the 'auto' policy of :func:`new_physio_like`, i.e.,
+        unless it is a file path, loaded here into a new object that is not
+        shared with the caller. Default: False
 
     Returns
     -------
@@ -144,14 +338,17 @@ def check_physio(data, ensure_fs=True, copy=False):
 
     from physutils.io import load_physio
 
+    # objects loaded from files are only referenced here, so need no copy
+    loaded = isinstance(data, (str, os.PathLike))
     if not isinstance(data, Physio):
         data = load_physio(data)
     if ensure_fs and np.isnan(data.fs):
         raise ValueError("Provided data does not have valid sampling rate.")
-    if copy is True:
+    if copy is True or (copy == "auto" and not loaded):
         return new_physio_like(
             data,
             data.data,
+            copy=copy,
             copy_history=True,
             copy_metadata=True,
             copy_suppdata=True,
@@ -169,6 +366,7 @@ def new_physio_like(
     fs=None,
     suppdata=None,
     dtype=None,
+    copy=True,
     copy_history=True,
     copy_metadata=True,
     copy_suppdata=True,
@@ -179,6 +377,12 @@ def new_physio_like(
     """
     Makes `data` into physio object like `ref_data`
 
+    Data that is not copied is shared with the caller (and possibly with
+    `ref_physio`), so the new physio object only holds a read-only view of it.
+    `ref_physio` is left untouched: changes made to its data through the
+    shared buffer are seen by the new object. To modify the data of the new
+    object, make a copy of it first.
+
     Parameters
     ----------
     ref_physio : Physio_like
@@ -192,6 +396,12 @@ def new_physio_like(
         New supplementary data. If not supplied, assumed to be the same.
     dtype : data_type, optional
         Data type to convert `data` to, if conversion needed. Default: None
+    copy : bool or 'auto', optional
+        Whether to copy `data`. If False, `data` is only copied if it must be
+        converted to `dtype`. If 'auto', `data` is copied unless it is an array
+        owning its buffer (e.g., the fresh result of a computation) that does
+        not overlap with the data of `ref_physio`; the caller should then not
+        modify it afterwards. Default: True
     copy_history : bool, optional
         Copy history from `ref_physio` to new physio object. Default: True
     copy_metadata : bool, optional
@@ -215,7 +425,7 @@ def new_physio_like(
         fs = ref_physio.fs
     if dtype is None:
         dtype = ref_physio.data.dtype
-    history = list(ref_physio.history) if copy_history else []
+    history = ref_physio._history if copy_history else []
     metadata = dict(**ref_physio._metadata) if copy_metadata else None
 
     if suppdata is None:
@@ -227,9 +437,22 @@ def new_physio_like(
         dict(ref_physio.computed_metrics) if copy_computed_metrics else {}
     )
 
+    ref_data = ref_physio._data
+    if copy == "auto":
+        copy = isinstance(data, np.ndarray) and (
+            data.base is not None
+            or (
+                isinstance(ref_data, np.ndarray) and np.may_share_memory(data, ref_data)
+            )
+        )
+    if copy is True:
+        data = np.array(data, dtype=dtype)
+    else:
+        data = _read_only(np.asarray(data, dtype=dtype))
+
     # make new class
     out = ref_physio.__class__(
-        np.array(data, dtype=dtype),
+        data,
         fs=fs,
         history=history,
         metadata=metadata,
@@ -241,6 +464,278 @@ def new_physio_like(
     return out
 
 
+@make_operation()
+def window_physio(data, start=None, stop=None, *, seconds=False):
+    """
+    Returns the window of `data` between `start` and `stop`
+
+    The returned Physio object is backed by a read-only view of the data of
+    `data`, which stays writable (changes made to it are seen by the window),
+    and keeps its sampling rate, history and metadata. Peaks, troughs
+    and rejected peaks in the window are kept, and shifted to be relative to
+    `start`. Supplementary data with one value per sample is also windowed.
+
+    Parameters
+    ----------
+    data : Physio_like
+        Input physiological data
+    start : int or float, optional
+        Start of the window (included), in samples or seconds. Negative values
+        count from the end of `data`. Default: None (start of `data`)
+    stop : int or float, optional
+        End of the window (excluded), in samples or seconds. Negative values
+        count from the end of `data`. Default: None (end of `data`)
+    seconds : bool, optional
+        Whether `start` and `stop` are in seconds instead of samples. Default:
+        False
+
+    Returns
+    -------
+    window : :class:`Physio`
+        Window of input `data`
+    """
+
+    data = check_physio(data, ensure_fs=seconds)
+    if seconds:
+        start = None if start is None else int(round(start * data.fs))
+        stop = None if stop is None else int(round(stop * data.fs))
+    size = len(data)
+    start, stop, _ = slice(start, stop).indices(size)
+    stop = max(start, stop)
+
+    suppdata = data.suppdata
+    if suppdata is not None and suppdata.ndim > 0:
+        if suppdata.shape[0] == size:
+            suppdata = suppdata[start:stop]
+        elif suppdata.shape[-1] == size:
+            suppdata = suppdata[..., start:stop]
+
+    window = new_physio_like(data, data.data[start:stop], suppdata=suppdata, copy=False)
+    # the copied metadata holds events as EventIndex, even if those of `data`
+    # were stored without going through _Metadata
+    for key in EVENT_KEYS:
+        window._metadata[key] = window._metadata[key].between(start, stop) - start
+
+    return window
+
+
+def _read_only(array):
+    """Returns a read-only view of `array`, or `array` if already read-only."""
+    if array.flags.writeable:
+        array = array.view()
+        array.flags.writeable = False
+    return array
+
+
+class History(Sequence):
+    """
+    Immutable sequence of the operations performed on a Physio object
+
+    History is stored as a linked chain of entries, each pointing to the
+    history it extends, so that Physio objects derived from one another share
+    their common history instead of copying it. Adding entries (with `+` or
+    `+=`) returns a new `History` in O(1) per entry, leaving the original
+    untouched. Otherwise, it behaves like a list of ``(function, arguments)``
+    tuples, and compares equal to lists with the same entries.
+
+    Parameters
+    ----------
+    entries : iterable of tuples, optional
+        Initial history entries. Default: ()
+    """
+
+    __slots__ = ("_parent", "_entry", "_len", "_items")
+
+    def __init__(self, entries=()):
+        node = entries
+        if not isinstance(entries, History):
+            node = History._node(None, None)
+            for entry in entries:
+                node = History._node(node, entry)
+        self._parent, self._entry = node._parent, node._entry
+        self._len, self._items = node._len, node._items
+
+    @staticmethod
+    def _node(parent, entry):
+        """Returns history extending `parent` with `entry` (empty if None)."""
+        node = History.__new__(History)
+        node._parent, node._entry, node._items = parent, entry, None
+        node._len = 0 if parent is None else parent._len + 1
+        return node
+
+    def _as_tuple(self):
+        """Returns all entries as a tuple, caching them for indexing."""
+        if self._items is None:
+            items, node = [], self
+            while node._len > 0:
+                items.append(node._entry)
+                node = node._parent
+            self._items = tuple(reversed(items))
+        return self._items
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(self._as_tuple()[key])
+        key = operator.index(key)
+        if key < 0:
+            key += self._len
+        if not 0 <= key < self._len:
+            raise IndexError("History index out of range")
+        # the most recent entries are the ones usually accessed; reach them
+        # without gathering the whole history
+        steps = self._len - 1 - key
+        if self._items is None and steps < 8:
+            node = self
+            for _ in range(steps):
+                node = node._parent
+            return node._entry
+        return self._as_tuple()[key]
+
+    def __iter__(self):
+        return iter(self._as_tuple())
+
+    def __add__(self, other):
+        out = self
+        for entry in other:
+            out = History._node(out, entry)
+        return out
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, History):
+            if self._parent is other._parent and self._entry is other._entry:
+                return self._len == other._len
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (History, (list(self),))
+
+    def __repr__(self):
+        return "History({})".format(list(self))
+
+
+class _Metadata(dict):
+    """
+    Dictionary of Physio metadata counting its modifications
+
+    `version` is incremented whenever an entry is set or removed, so that
+    values derived from the metadata can be cached. Arrays modified in place
+    are not tracked: assign a new array instead.
+
+    Events (see `EVENT_KEYS`) are stored as read-only, sorted
+    :class:`physutils.events.EventIndex` arrays.
+    """
+
+    # class-level default, as unpickling sets entries before instance attributes
+    version = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key in EVENT_KEYS and not isinstance(value, EventIndex):
+            value = EventIndex(value)
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def clear(self):
+        """Removes all entries."""
+        super().clear()
+        self.version += 1
+
+    def pop(self, *args):
+        """Removes an entry and returns its value."""
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        """Removes the last inserted entry and returns it."""
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        """Returns value of `key`, setting it to `default` if missing."""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        """Updates entries from a mapping or iterable of pairs."""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def copy(self):
+        """Returns a shallow copy of the metadata."""
+        return self.__class__(self)
+
+
+class _LazyData:
+    """
+    Placeholder for data that is only read when first accessed
+
+    Exposes the size, shape and type of the data without loading it.
+
+    Parameters
+    ----------
+    loader : callable
+        Function returning the data
+    shape : tuple
+        Shape of the data
+    dtype : data_type
+        Data type of the data
+    """
+
+    def __init__(self, loader, shape, dtype):
+        self._loader = loader
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self):
+        if self.ndim == 0:
+            raise TypeError("len() of unsized object")
+        return self.shape[0]
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the data"""
+        return len(self.shape)
+
+    @property
+    def size(self):
+        """Number of elements of the data"""
+        return int(np.prod(self.shape))
+
+    def squeeze(self):
+        """Returns placeholder for the data without its singleton dimensions."""
+        return _LazyData(
+            lambda: self.load().squeeze(),
+            tuple(n for n in self.shape if n != 1),
+            self.dtype,
+        )
+
+    def load(self):
+        """Returns the data, reading it."""
+        return np.asarray(self._loader())
+
+
 class Physio:
     """
     Class to hold physiological data and relevant information
@@ -248,10 +743,10 @@ class Physio:
     Parameters
     ----------
     data : array_like
-        Input data array
+        Input data array. :class:`numpy.memmap` arrays are kept memory-mapped
     fs : float, optional
         Sampling rate of `data` (Hz). Default: None
-    history : list of tuples, optional
+    history : list of tuples or :class:`History`, optional
         Functions performed on `data`. Default: None
     metadata : dict, optional
         Metadata associated with `data`. Default: None
@@ -266,7 +761,9 @@ class Physio:
         Sampling rate of `data` in Hz
     history : list of tuples
         History of functions that have been performed on `data`, with relevant
-        parameters provided to functions.
+        parameters provided to functions. It is stored as a :class:`History`
+        shared with the objects derived from this one, and only gathered into
+        a list when accessed.
     peaks : :obj:`numpy.ndarray`
         Indices of peaks in `data`
     troughs : :obj:`numpy.ndarray`
@@ -291,15 +788,19 @@ class Physio:
     ):
         _supported_physio_types = ["respiratory", "cardiac", None]
         logger.debug("Initializing new Physio object")
-        self._data = np.asarray(data).squeeze()
-        if self.data.ndim > 1:
+        # keep memory-mapped or not yet loaded data on disk
+        if isinstance(data, (np.memmap, _LazyData)):
+            self._data = data.squeeze()
+        else:
+            self._data = np.asarray(data).squeeze()
+        if self._data.ndim > 1:
             raise ValueError(
-                "Provided data dimensionality {} > 1.".format(self.data.ndim)
+                "Provided data dimensionality {} > 1.".format(self._data.ndim)
             )
 
-        if not np.issubdtype(self.data.dtype, np.number):
+        if not np.issubdtype(self._data.dtype, np.number):
             raise ValueError(
-                "Provided data of type {} is not numeric.".format(self.data.dtype)
+                "Provided data of type {} is not numeric.".format(self._data.dtype)
             )
         self._fs = np.float64(fs)
         self._physio_type = None if physio_type is None else physio_type
@@ -311,14 +812,16 @@ class Physio:
             )
 
         self._label = label
-        self._history = [] if history is None else history
-        if not isinstance(self._history, list) or any(
-            [not isinstance(f, tuple) for f in self._history]
+        history = [] if history is None else history
+        if not isinstance(history, History) and (
+            not isinstance(history, list)
+            or any([not isinstance(f, tuple) for f in history])
         ):
             raise TypeError(
                 "Provided history {} must be a list-of-tuples. "
                 "Please check inputs.".format(history)
             )
+        self._history = history
         if metadata is not None:
             if not isinstance(metadata, dict):
                 raise TypeError(
@@ -351,11 +854,11 @@ class Physio:
         return self.data[slicer]
 
     def __len__(self):
-        return len(self.data)
+        return len(self._data)
 
     def __str__(self):
         return "{name}(size={size}, fs={fs})".format(
-            name=self.__class__.__name__, size=self.data.size, fs=self.fs
+            name=self.__class__.__name__, size=self._data.size, fs=self.fs
         )
 
     __repr__ = __str__
@@ -363,6 +866,8 @@ class Physio:
     @property
     def data(self):
         """Physiological data"""
+        if isinstance(self._data, _LazyData):
+            self._data = self._data.load()
         return self._data
 
     @property
@@ -373,12 +878,40 @@ class Physio:
     @property
     def history(self):
         """Functions that have been performed on / modified `data`."""
-        return self._history
+        if self._history_list is None:
+            self._history_list = list(self._history_chain)
+        return self._history_list
+
+    @property
+    def _history(self):
+        # pick up entries added through the list returned by `history`
+        items, chain = self._history_list, self._history_chain
+        if items is not None and (
+            len(items) != len(chain) or any(a is not b for a, b in zip(items, chain))
+        ):
+            self._history_chain = chain = History(items)
+        return chain
+
+    @_history.setter
+    def _history(self, history):
+        if not isinstance(history, History):
+            history = History(history)
+        self._history_chain, self._history_list = history, None
+
+    @property
+    def _metadata(self):
+        return self._metadata_dict
+
+    @_metadata.setter
+    def _metadata(self, metadata):
+        if not isinstance(metadata, _Metadata):
+            metadata = _Metadata(metadata)
+        self._metadata_dict = metadata
 
     @property
     def peaks(self):
         """Indices of detected peaks in `data`"""
-        return self._masked.compressed()
+        return self._get_peaks()[1]
 
     @property
     def troughs(self):
@@ -387,10 +920,95 @@ class Physio:
 
     @property
     def _masked(self):
-        return np.ma.masked_array(
-            self._metadata["peaks"],
-            mask=np.isin(self._metadata["peaks"], self._metadata["reject"]),
-        )
+        return self._get_peaks()[0]
+
+    def _get_peaks(self):
+        """
+        Returns masked array of peaks and array of accepted peaks
+
+        Both are cached until the metadata is modified.
+        """
+        metadata = self._metadata
+        cached = getattr(self, "_peaks_cache", None)
+        if cached is None or cached[0] is not metadata or cached[1] != metadata.version:
+            # values written without going through _Metadata are plain arrays
+            peaks, reject = (
+                value if isinstance(value, EventIndex) else EventIndex(value)
+                for value in (metadata["peaks"], metadata["reject"])
+            )
+            mask = reject.contains(peaks)
+            masked = np.ma.masked_array(peaks.view(np.ndarray), mask=mask)
+            peaks = peaks[~mask]
+            peaks.flags.writeable = False
+            cached = self._peaks_cache = (metadata, metadata.version, masked, peaks)
+        return cached[2], cached[3]
+
+    def window(self, start=None, stop=None, *, seconds=False):
+        """
+        Returns the window of the data between `start` and `stop`
+
+        See :func:`window_physio`, which this calls.
+
+        Parameters
+        ----------
+        start : int or float, optional
+            Start of the window (included). Default: None
+        stop : int or float, optional
+            End of the window (excluded). Default: None
+        seconds : bool, optional
+            Whether `start` and `stop` are in seconds instead of samples.
+            Default: False
+
+        Returns
+        -------
+        window : :class:`Physio`
+            Window of the data, backed by a view of it
+        """
+        return window_physio(self, start, stop, seconds=seconds)
+
+    def sliding_windows(self, size, step=None, *, seconds=False, events="peaks"):
+        """
+        Returns all sliding windows of the data, as a 2D view
+
+        See :func:`physutils.windows.sliding_windows`, which this calls.
+
+        Parameters
+        ----------
+        size, step, seconds, events : optional
+            See :func:`physutils.windows.sliding_windows`
+
+        Returns
+        -------
+        windows : :class:`physutils.windows.Windows`
+            Start, data and events of the windows
+        """
+        from physutils.windows import sliding_windows
+
+        return sliding_windows(self, size, step, seconds=seconds, events=events)
+
+    def iter_windows(self, size, step=None, *, seconds=False, events="peaks"):
+        """
+        Yields sliding windows of the data with the events in each of them
+
+        See :func:`physutils.windows.iter_windows`, which this calls.
+
+        Parameters
+        ----------
+        size, step, seconds, events : optional
+            See :func:`physutils.windows.sliding_windows`
+
+        Yields
+        ------
+        start : int
+            Index of the first sample of the window
+        window : :obj:`numpy.ndarray`
+            Read-only view of the data of the window
+        window_events : :obj:`numpy.ndarray`
+            Events in the window, relative to `start`
+        """
+        from physutils.windows import iter_windows
+
+        return iter_windows(self, size, step, seconds=seconds, events=events)
 
     @property
     def suppdata(self):
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Helper class for holding multi-channel physiological data sharing a time base
+"""
+
+import numpy as np
+from loguru import logger
+
+from physutils.physio import History, Physio, _read_only
+
+
+class PhysioSet:
+    """
+    Class to hold multi-channel physiological data sharing a sampling rate
+
+    All channels are stored in one contiguous (channels x samples) array, so
+    that operations can be applied to all of them at once, e.g.
+    ``physioset.data.mean(axis=1)``, or
+    ``physioset.new_like(signal.filtfilt(b, a, physioset.data, axis=1))``.
+    Single channels can be extracted as :class:`physutils.Physio` objects
+    backed by a view of their row, without copying it. The data is read-only,
+    as it is shared with those objects.
+
+    Parameters
+    ----------
+    data : (C, N) array_like
+        Input physiological data, with one row per channel
+    channels : list of str
+        Name of each channel
+    fs : float, optional
+        Sampling rate of `data` (Hz). Default: None
+    history : list of tuples, optional
+        Functions performed on `data`, shared by all channels. Default: None
+    metadata : list of dict, optional
+        Metadata of each channel (see :class:`physutils.Physio`). Default: None
+    physio_types : list, optional
+        Physiological signal type of each channel (see
+        :class:`physutils.Physio`). Default: None
+    label : str, optional
+        Label of the data. Default: None
+
+    Attributes
+    ----------
+    data : (C, N) :obj:`numpy.ndarray`
+        Physiological data, with one row per channel (read-only)
+    channels : list of str
+        Name of each channel
+    fs : float
+        Sampling rate of data in Hz
+    history : list of tuples
+        History of functions that have been performed on `data`
+    metadata : list of dict
+        Metadata of each channel
+    physio_types : list
+        Physiological signal type of each channel
+    label : str
+        Label of the data
+    """
+
+    def __init__(
+        self,
+        data,
+        channels,
+        fs=None,
+        history=None,
+        metadata=None,
+        physio_types=None,
+        label=None,
+    ):
+        logger.debug("Initializing new PhysioSet object")
+        self._data = _read_only(np.ascontiguousarray(data))
+        if self._data.ndim != 2:
+            raise ValueError(
+                "Provided data dimensionality {} != 2.".format(self._data.ndim)
+            )
+        n_channels = self._data.shape[0]
+        self._channels = list(channels)
+        if len(self._channels) != n_channels:
+            raise ValueError(
+                "Provided {} channel names for {} channels.".format(
+                    len(self._channels), n_channels
+                )
+            )
+        metadata = [None] * n_channels if metadata is None else list(metadata)
+        physio_types = (
+            [None] * n_channels if physio_types is None else list(physio_types)
+        )
+        if len(metadata) != n_channels or len(physio_types) != n_channels:
+            raise ValueError(
+                "Provided metadata and physio_types must have one entry per channel."
+            )
+
+        # let Physio check history, metadata and types of each channel
+        if isinstance(history, list):
+            history = History(history)
+        self._physio = [
+            Physio(
+                row,
+                fs=fs,
+                history=history,
+                metadata=meta,
+                physio_type=physio_type,
+                label=label,
+            )
+            for row, meta, physio_type in zip(self._data, metadata, physio_types)
+        ]
+        self._fs = np.float64(fs)
+        self._history = History([] if history is None else history)
+        self._label = label
+
+    @classmethod
+    def from_physio(cls, physio_objects):
+        """
+        Stacks single-channel Physio objects into a PhysioSet
+
+        Parameters
+        ----------
+        physio_objects : dict
+            :class:`physutils.Physio` objects with the same sampling rate and
+            length, keyed by channel name (e.g., as returned by
+            :func:`physutils.io.load_from_bids`)
+
+        Returns
+        -------
+        physioset : :class:`PhysioSet`
+            Stacked data. History and label are taken from the first channel.
+        """
+        objects = list(physio_objects.values())
+        if len(objects) == 0:
+            raise ValueError("At least one Physio object must be provided.")
+        if len({phys.fs for phys in objects}) > 1 or len(set(map(len, objects))) > 1:
+            raise ValueError(
+                "Provided Physio objects must have the same sampling rate and length."
+            )
+        return cls(
+            np.stack([phys.data for phys in objects]),
+            list(physio_objects),
+            fs=objects[0].fs,
+            history=objects[0]._history,
+            metadata=[dict(phys._metadata) for phys in objects],
+            physio_types=[phys.physio_type for phys in objects],
+            label=objects[0].label,
+        )
+
+    def new_like(self, data, history=None):
+        """
+        Returns a PhysioSet like this one, holding `data`
+
+        Parameters
+        ----------
+        data : (C, N) array_like
+            New physiological data, with the same number of channels
+        history : list of tuples, optional
+            Entries to add to history. Default: None
+
+        Returns
+        -------
+        physioset : :class:`PhysioSet`
+            New PhysioSet, with the channels, sampling rate, history, metadata
+            and types of this one
+        """
+        return self.__class__(
+            data,
+            self.channels,
+            fs=self.fs,
+            history=self._history + (history or []),
+            metadata=self.metadata,
+            physio_types=self.physio_types,
+            label=self.label,
+        )
+
+    def to_dict(self):
+        """
+        Returns the channels as single-channel Physio objects
+
+        Returns
+        -------
+        physio_objects : dict
+            :class:`physutils.Physio` objects, backed by read-only views of
+            `data`, keyed by channel name
+        """
+        return dict(zip(self.channels, self._physio))
+
+    def __reduce__(self):
+        # rebuild from the stacked array, so that channels view it again and
+        # their rows are not pickled as separate copies
+        return (
+            self.__class__,
+            (
+                np.asarray(self._data),
+                self.channels,
+                self.fs,
+                list(self._history),
+                [dict(meta) for meta in self.metadata],
+                self.physio_types,
+                self.label,
+            ),
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.data, dtype=dtype)
+
+    def __getitem__(self, key):
+        """Returns channel `key` (name or index) as a Physio object."""
+        if not isinstance(key, str):
+            return self._physio[key]
+        try:
+            return self._physio[self.channels.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.channels
+
+    def __iter__(self):
+        return iter(self.channels)
+
+    def __len__(self):
+        return len(self.channels)
+
+    def __str__(self):
+        return "{name}(channels={channels}, size={size}, fs={fs})".format(
+            name=self.__class__.__name__,
+            channels=self.channels,
+            size=self.data.shape[1],
+            fs=self.fs,
+        )
+
+    __repr__ = __str__
+
+    def keys(self):
+        """Names of the channels"""
+        return list(self.channels)
+
+    def items(self):
+        """Pairs of channel name and Physio object"""
+        return self.to_dict().items()
+
+    @property
+    def data(self):
+        """Physiological data, with one row per channel"""
+        return self._data
+
+    @property
+    def channels(self):
+        """Name of each channel"""
+        return self._channels
+
+    @property
+    def fs(self):
+        """Sampling rate of data (Hz)"""
+        return self._fs
+
+    @property
+    def history(self):
+        """Functions that have been performed on / modified `data`."""
+        return list(self._history)
+
+    @property
+    def metadata(self):
+        """Metadata of each channel"""
+        return [phys._metadata for phys in self._physio]
+
+    @property
+    def physio_types(self):
+        """Physiological signal type of each channel"""
+        return [phys.physio_type for phys in self._physio]
+
+    @property
+    def label(self):
+        """PhysioSet instance label"""
+        return self._label
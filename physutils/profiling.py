@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Timing and memory instrumentation of Physio operations
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# per context (thread or task), so that profiles only record their own calls
+_PROFILE = ContextVar("profile", default=None)
+
+
+class OperationProfile:
+    """
+    Records the resources used by each call of a Physio operation
+
+    Instances are created by :func:`profile_operations`; every function
+    decorated with :func:`physutils.physio.make_operation` that runs while
+    profiling is active adds a record to `records`.
+
+    Attributes
+    ----------
+    records : list of dict
+        One record per call, with the operation name, the label of the output
+        Physio object, its position in the output history (`step`), the wall
+        time and CPU time in seconds and the peak memory allocated during the
+        call in bytes (`peak_memory`; None if memory is not traced)
+    trace_memory : bool
+        Whether peak memory is recorded
+    """
+
+    def __init__(self, trace_memory=True):
+        self.records = []
+        self.trace_memory = trace_memory
+        # peak memory seen by nested operations, one item per running call
+        self._stack = []
+
+    def _start(self):
+        """Marks the start of an operation and returns its start state."""
+        memory = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, "reset_peak"):
+                # keep the peak of running (outer) operations before resetting
+                if len(self._stack) > 0:
+                    self._stack[-1] = max(self._stack[-1], peak)
+                tracemalloc.reset_peak()
+            memory = current
+        self._stack.append(0)
+        return time.perf_counter(), time.process_time(), memory
+
+    def _stop(self, start):
+        """Returns the wall time, CPU time and peak memory since `start`."""
+        wall, cpu, memory = start
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        nested_peak = self._stack.pop()
+        if memory is not None:
+            peak = max(tracemalloc.get_traced_memory()[1], nested_peak)
+            if len(self._stack) > 0:
+                self._stack[-1] = max(self._stack[-1], peak)
+            memory = peak - memory
+        return wall, cpu, memory
+
+    def _add(self, name, data, usage):
+        """Records `usage` of operation `name`, which returned `data`."""
+        if isinstance(data, tuple):
+            data = data[0]
+        wall, cpu, memory = usage
+        self.records.append(
+            dict(
+                operation=name,
+                label=getattr(data, "label", None),
+                step=len(data._history) - 1 if hasattr(data, "_history") else None,
+                wall_time=wall,
+                cpu_time=cpu,
+                peak_memory=memory,
+            )
+        )
+
+    def report(self):
+        """
+        Returns the resources used by each operation, aggregated over calls
+
+        Returns
+        -------
+        report : dict
+            Dictionary with one entry per operation, sorted by decreasing total
+            wall time. Each entry is a dictionary with the number of `calls`,
+            the total `wall_time` and `cpu_time` and the maximum `peak_memory`
+            of the operation.
+        """
+        report = {}
+        for record in self.records:
+            stats = report.setdefault(
+                record["operation"],
+                dict(calls=0, wall_time=0.0, cpu_time=0.0, peak_memory=None),
+            )
+            stats["calls"] += 1
+            stats["wall_time"] += record["wall_time"]
+            stats["cpu_time"] += record["cpu_time"]
+            if record["peak_memory"] is not None:
+                stats["peak_memory"] = max(
+                    stats["peak_memory"] or 0, record["peak_memory"]
+                )
+        return dict(
+            sorted(report.items(), key=lambda item: item[1]["wall_time"], reverse=True)
+        )
+
+    def __str__(self):
+        lines = [
+            "{:<50} {:>6} {:>10} {:>10} {:>12}".format(
+                "operation", "calls", "wall (s)", "cpu (s)", "peak (MiB)"
+            )
+        ]
+        for name, stats in self.report().items():
+            peak = stats["peak_memory"]
+            lines.append(
+                "{:<50} {:>6} {:>10.4f} {:>10.4f} {:>12}".format(
+                    name,
+                    stats["calls"],
+                    stats["wall_time"],
+                    stats["cpu_time"],
+                    "-" if peak is None else "{:.2f}".format(peak / 1024**2),
+                )
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile_operations(trace_memory=True):
+    """
+    Context manager recording the resources used by Physio operations
+
+    Only operations run in the current thread (or asyncio task) are recorded.
+    Operations are not profiled while history recording is disabled (see
+    :func:`physutils.physio.disable_history`).
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether to record the peak memory allocated by each operation, with
+        :mod:`tracemalloc`. Tracing slows down code that allocates many Python
+        objects. Default: True
+
+    Yields
+    ------
+    profile : :class:`OperationProfile`
+        Records of the operations run in the context
+
+    Examples
+    --------
+    >>> with profile_operations() as profile:  # doctest: +SKIP
+    ...     filtered = filter_physio(data, [5.0, 15.0], "bandpass")
+    >>> print(profile)  # doctest: +SKIP
+    """
+    profile = OperationProfile(trace_memory=trace_memory)
+    token = _PROFILE.set(profile)
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield profile
+    finally:
+        _PROFILE.reset(token)
+        if started:
+            tracemalloc.stop()
@@ -60,6 +60,9 @@ def generate_physio(
         if bids_parameters is {}:
             raise ValueError("BIDS parameters must be provided when loading from BIDS")
         else:
+            if col_physio_type and "columns" not in bids_parameters:
+                # only parse the requested column
+                bids_parameters = dict(columns=[col_physio_type], **bids_parameters)
             physio_array = load_from_bids(input_file, **bids_parameters)
             physio_obj = (
                 physio_array[col_physio_type] if col_physio_type else physio_array
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+
+from physutils import cache, io, utils
+from physutils.tests.utils import (
+    create_random_bids_structure,
+    filter_physio,
+    get_test_data_path,
+)
+
+BIDS_KWARGS = dict(subject="01", session="01", task="rest", run="01")
+
+
+def test_load_from_bids_cache(tmpdir):
+    bids_dir = create_random_bids_structure("physutils/tests/data")
+    fname = os.path.join(bids_dir, "sub-01_ses-01_task-rest_run-01_physio.tsv.gz")
+    cache_dir = tmpdir.join("cache").strpath
+
+    orig = io.load_from_bids("physutils/tests/data/bids-dir", **BIDS_KWARGS)
+    first = io.load_from_bids(
+        "physutils/tests/data/bids-dir",
+        columns=["cardiac"],
+        cache_dir=cache_dir,
+        **BIDS_KWARGS,
+    )
+    cached = cache.load_cached_columns(cache_dir, fname, [0, 1, 3])
+    assert sorted(cached) == [0, 3]
+    assert isinstance(cached[3], np.memmap)
+
+    second = io.load_from_bids(
+        "physutils/tests/data/bids-dir", cache_dir=cache_dir, **BIDS_KWARGS
+    )
+    assert sorted(cache.load_cached_columns(cache_dir, fname, range(6))) == list(
+        range(6)
+    )
+    for col in orig:
+        assert np.array_equal(orig[col].data, second[col].data)
+    assert np.array_equal(first["cardiac"].data, orig["cardiac"].data)
+
+    # modifying the source file invalidates the cache
+    stat = os.stat(fname)
+    os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.load_cached_columns(cache_dir, fname, [0]) == {}
+
+
+def test_save_npy_atomic(tmpdir):
+    fname = tmpdir.join("array.npy").strpath
+    utils.save_npy_atomic(fname, np.arange(5))
+    utils.save_npy_atomic(fname, np.arange(3))
+    assert np.array_equal(np.load(fname), np.arange(3))
+    assert os.listdir(tmpdir.strpath) == ["array.npy"]
+    assert os.stat(fname).st_mode & 0o777 == 0o666 & ~utils._UMASK
+
+
+def test_evict_clear_cache(tmpdir):
+    cache_dir = tmpdir.join("cache").strpath
+    sources = []
+    for n in range(3):
+        sources.append(tmpdir.join(f"source{n}.tsv").strpath)
+        np.savetxt(sources[-1], np.arange(10))
+        cache.save_cached_columns(cache_dir, sources[-1], {0: np.arange(1000.0)})
+    assert len(os.listdir(cache_dir)) == 3
+
+    # least recently used entry goes first
+    cache.load_cached_columns(cache_dir, sources[0], [0])
+    evicted = cache.evict(cache_dir, max_size=20000)
+    assert evicted == [cache._get_entry_dir(cache_dir, sources[1])]
+    assert cache.load_cached_columns(cache_dir, sources[1], [0]) == {}
+    assert 0 in cache.load_cached_columns(cache_dir, sources[0], [0])
+
+    cache.clear_cache(cache_dir)
+    assert os.listdir(cache_dir) == []
+
+
+def test_load_history_cache(tmpdir, caplog):
+    cache_dir = tmpdir.join("cache").strpath
+    phys = io.load_physio(get_test_data_path("ECG.csv"), fs=1000.0)
+    filt = filter_physio(phys, [5.0, 15.0], "bandpass")
+    path = io.save_history(tmpdir.join("history").strpath, filt)
+
+    replayed = io.load_history(path, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+    cached = io.load_history(path, cache_dir=cache_dir)
+    assert "Resuming replay of {} from step 2".format(path) in caplog.text
+    assert np.allclose(cached, replayed)
+    assert cached.history == replayed.history == filt.history
+
+    # only the steps after the cached ones are rerun
+    filt = filter_physio(phys, 10.0, "lowpass")
+    path = io.save_history(tmpdir.join("history").strpath, filt)
+    replayed = io.load_history(path, cache_dir=cache_dir)
+    assert "Resuming replay of {} from step 1".format(path) in caplog.text
+    assert np.allclose(filt, replayed)
+    assert replayed.history == filt.history
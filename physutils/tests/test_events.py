@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+import numpy as np
+import pytest
+
+from physutils.events import EventIndex
+from physutils.physio import Physio
+
+DATA = np.arange(100)
+
+
+def test_event_index():
+    events = EventIndex([30, 10, 20, 20])
+    assert np.array_equal(events, [10, 20, 30])
+    assert not events.flags.writeable
+    with pytest.raises(ValueError):
+        events[0] = 5
+
+    assert 20 in events and 25 not in events
+    assert np.array_equal(events.contains([5, 10, 30, 40]), [False, True, True, False])
+    assert np.array_equal(events.between(15, 30), [20])
+    assert isinstance(events.between(15), EventIndex)
+
+    # edits return new indices
+    assert np.array_equal(events.insert([25, 5, 20]), [5, 10, 20, 25, 30])
+    assert np.array_equal(events.remove([20, 40]), [10, 30])
+    assert np.array_equal(events.update(add=[40], remove=[10, 40]), [20, 30])
+    assert np.array_equal(events, [10, 20, 30])
+    assert np.array_equal(EventIndex().insert(3), [3])
+    assert EventIndex().remove(3).size == 0
+
+    # results that may be out of order are plain arrays
+    assert type(events[::-1]) is np.ndarray
+    assert type(events - 10) is np.ndarray
+    assert np.array_equal(pickle.loads(pickle.dumps(events)), events)
+
+
+def test_physio_events():
+    phys = Physio(DATA, fs=1000, metadata=dict(peaks=[30, 10, 10], troughs=[15]))
+    assert isinstance(phys._metadata["peaks"], EventIndex)
+    assert isinstance(phys.troughs, EventIndex)
+    assert np.array_equal(phys.peaks, [10, 30])
+
+    phys._metadata["reject"] = phys._metadata["reject"].insert(30)
+    assert np.array_equal(phys.peaks, [10])
+    assert np.array_equal(phys._masked.mask, [False, True])
+    phys._metadata.update(peaks=phys._metadata["peaks"].insert(50))
+    assert np.array_equal(phys.peaks, [10, 50])
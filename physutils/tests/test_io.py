@@ -2,15 +2,17 @@
 
 import json
 import os
+import sys
 
 import numpy as np
 import pytest
 
-from physutils import io, physio
+from physutils import io, physio, utils
 from physutils.tests.utils import (
     create_random_bids_structure,
     filter_physio,
     get_test_data_path,
+    weight_physio,
 )
 
 
@@ -50,6 +52,31 @@ def test_load_physio(caplog):
         io.load_physio([1, 2, 3])
 
 
+@pytest.mark.parametrize("reader", ["pyarrow", "loadtxt"])
+def test_load_tsv(tmpdir, monkeypatch, reader):
+    if reader == "pyarrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+    bids_dir = create_random_bids_structure("physutils/tests/data")
+    fname = os.path.join(bids_dir, "sub-01_ses-01_task-rest_run-01_physio.tsv.gz")
+    expected = np.loadtxt(fname)
+    columns = io._load_tsv(fname)
+    assert len(columns) == 6 and columns[0].shape == (100000,)
+    assert np.array_equal(np.column_stack(columns), expected)
+    selected = np.column_stack(io._load_tsv(fname, usecols=[4, 1]))
+    assert np.array_equal(selected, expected[:, [4, 1]])
+    if reader == "pyarrow":
+        # columns are separate contiguous arrays, which need no copy
+        assert columns[2].flags.c_contiguous and columns[2].flags.writeable
+        assert not np.may_share_memory(columns[1], columns[2])
+
+    # space-delimited tables are read too
+    spaced = tmpdir.join("spaced.tsv").strpath
+    np.savetxt(spaced, expected[:10], delimiter=" ")
+    assert np.array_equal(np.column_stack(io._load_tsv(spaced)), expected[:10])
+
+
 def test_load_from_bids():
     create_random_bids_structure("physutils/tests/data", recording_id="cardiac")
     phys_array = io.load_from_bids(
@@ -87,6 +114,115 @@ def test_load_from_bids_no_rec():
         assert phys_array[col].history[0][0] == "physutils.io.load_from_bids"
 
 
+def test_load_from_bids_columns():
+    create_random_bids_structure("physutils/tests/data", recording_id="cardiac")
+    bids_kwargs = dict(
+        subject="01", session="01", task="rest", run="01", recording="cardiac"
+    )
+    phys_array = io.load_from_bids(
+        "physutils/tests/data/bids-dir", columns=["cardiac"], **bids_kwargs
+    )
+    assert list(phys_array.keys()) == ["cardiac"]
+    assert phys_array["cardiac"].data.size == 80000
+    assert phys_array["cardiac"].history[0][1]["columns"] == ["cardiac"]
+
+    phys_array = io.load_from_bids(
+        "physutils/tests/data/bids-dir", physio_types=["respiratory"], **bids_kwargs
+    )
+    assert list(phys_array.keys()) == [
+        "respiratory_chest",
+        "respiratory_CO2",
+        "respiratory_O2",
+    ]
+    with pytest.raises(ValueError):
+        io.load_from_bids(
+            "physutils/tests/data/bids-dir", columns=["ecg"], **bids_kwargs
+        )
+
+
+def test_load_from_bids_memory():
+    create_random_bids_structure("physutils/tests/data", recording_id="cardiac")
+    bids_kwargs = dict(
+        subject="01", session="01", task="rest", run="01", recording="cardiac"
+    )
+    copied = io.load_from_bids("physutils/tests/data/bids-dir", **bids_kwargs)
+    views = io.load_from_bids(
+        "physutils/tests/data/bids-dir", memory="view", **bids_kwargs
+    )
+    for col in copied:
+        assert copied[col].data.flags.c_contiguous
+        assert np.array_equal(copied[col].data, views[col].data)
+    # copied columns do not keep the parsed table (nor each other) alive
+    assert not np.may_share_memory(copied["cardiac"].data, copied["trigger"].data)
+    assert copied["cardiac"].history[0][1]["memory"] == "copy"
+    with pytest.raises(ValueError):
+        io.load_from_bids("physutils/tests/data/bids-dir", memory="mmap", **bids_kwargs)
+
+
+def test_load_from_bids_layout():
+    create_random_bids_structure("physutils/tests/data", recording_id="cardiac")
+    bids_kwargs = dict(
+        subject="01", session="01", task="rest", run="01", recording="cardiac"
+    )
+    utils.clear_bids_layouts()
+    layout = utils.get_bids_layout("physutils/tests/data/bids-dir")
+    assert utils.get_bids_layout("physutils/tests/data/bids-dir") is layout
+
+    phys_array = io.load_from_bids(
+        "physutils/tests/data/bids-dir", layout=layout, **bids_kwargs
+    )
+    assert phys_array["cardiac"].data.size == 80000
+    assert "layout" not in phys_array["cardiac"].history[0][1]
+
+    # missing files do not trigger indexing the dataset again
+    with pytest.raises(FileNotFoundError):
+        io.load_from_bids("physutils/tests/data/bids-dir", subject="02")
+    assert utils.get_bids_layout("physutils/tests/data/bids-dir") is layout
+    # but changes to the dataset root do
+    stat = os.stat("physutils/tests/data/bids-dir")
+    os.utime(
+        "physutils/tests/data/bids-dir",
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9),
+    )
+    assert utils.get_bids_layout("physutils/tests/data/bids-dir") is not layout
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_load_bids_dataset(use_processes):
+    create_random_bids_structure("physutils/tests/data")
+    create_random_bids_structure("physutils/tests/data", recording_id="cardiac")
+    loaded = list(
+        io.load_bids_dataset(
+            "physutils/tests/data/bids-dir",
+            subject="01",
+            columns=["cardiac"],
+            n_jobs=2,
+            use_processes=use_processes,
+        )
+    )
+    assert sorted(str(ents.get("recording")) for ents, _ in loaded) == [
+        "None",
+        "cardiac",
+    ]
+    for ents, phys_array in loaded:
+        assert list(phys_array.keys()) == ["cardiac"]
+        assert phys_array["cardiac"].data.size == 80000
+        func, kwargs = phys_array["cardiac"].history[0]
+        assert func == "physutils.io.load_from_bids"
+        assert kwargs["recording"] == ents.get("recording")
+        # as recorded by load_from_bids itself
+        single = io.load_from_bids(
+            "physutils/tests/data/bids-dir",
+            subject="01",
+            session="01",
+            task="rest",
+            run="01",
+            recording=ents.get("recording"),
+            columns=["cardiac"],
+        )
+        assert single["cardiac"].history[0] == (func, kwargs)
+
+
 def test_save_physio(tmpdir):
     pckl = io.load_physio(get_test_data_path("ECG.phys"), allow_pickle=True)
     out = io.save_physio(tmpdir.join("tmp").purebasename, pckl)
@@ -94,6 +230,103 @@ def test_save_physio(tmpdir):
     assert isinstance(io.load_physio(out, allow_pickle=True), physio.Physio)
 
 
+def test_save_physio_mmap(tmpdir, caplog):
+    pckl = io.load_physio(get_test_data_path("ECG.phys"), allow_pickle=True)
+    out = io.save_physio(tmpdir.join("mmap").strpath, pckl, compression=False)
+    mmapped = io.load_physio(out, allow_pickle=True, mmap_mode="r")
+    assert isinstance(mmapped.data, np.memmap)
+    assert isinstance(mmapped[:100], np.memmap)
+    assert mmapped.data.flags.aligned and mmapped.data.offset % io.PHYS_ALIGN == 0
+    assert np.array_equal(mmapped.data, pckl.data)
+    assert mmapped.fs == pckl.fs
+    assert mmapped.history == pckl.history
+
+    # modes that would overwrite the file are refused
+    size = os.path.getsize(out)
+    with pytest.raises(ValueError):
+        io.load_physio(out, mmap_mode="w+")
+    assert os.path.getsize(out) == size
+
+    # compressed files are loaded in memory
+    compressed = io.load_physio(
+        get_test_data_path("ECG.phys"), allow_pickle=True, mmap_mode="r"
+    )
+    assert caplog.text.count("cannot be memory-mapped") == 1
+    assert not isinstance(compressed.data, np.memmap)
+
+
+def test_save_physio_no_pickle(tmpdir, caplog):
+    phys = physio.Physio(
+        np.loadtxt(get_test_data_path("ECG.csv")),
+        fs=1000.0,
+        history=[("physutils.io.load_physio", {"data": "ECG.csv", "fs": 1000.0})],
+        metadata=dict(peaks=[10, 20, 30], reject=[20], label="ECG"),
+    )
+    out = io.save_physio(tmpdir.join("tmp").strpath, phys)
+    loaded = io.load_physio(out, allow_pickle=False)
+    assert loaded.history == phys.history
+    assert np.array_equal(loaded.peaks, [10, 30])
+    assert loaded._metadata["label"] == "ECG"
+    for key in ["peaks", "troughs", "reject"]:
+        assert loaded._metadata[key].dtype.kind == "i"
+
+    # objects that cannot be saved as JSON fall back to the legacy format
+    phys._metadata["unserializable"] = object()
+    out = io.save_physio(tmpdir.join("legacy").strpath, phys)
+    assert caplog.text.count("legacy format") == 1
+    assert "unserializable" in io.load_physio(out, allow_pickle=True)._metadata
+
+
+@pytest.mark.parametrize("compression", [False, True, 1, "zlib", "lz4", "zstd"])
+def test_save_physio_compression(tmpdir, compression):
+    if compression in io.CODECS:
+        pytest.importorskip({"lz4": "lz4", "zstd": "zstandard"}[compression])
+    pckl = io.load_physio(get_test_data_path("ECG.phys"), allow_pickle=True)
+    out = io.save_physio(tmpdir.join("tmp").strpath, pckl, compression=compression)
+    loaded = io.load_physio(out, allow_pickle=True)
+    assert np.array_equal(loaded.data, pckl.data)
+    assert loaded.data.dtype == pckl.data.dtype
+    assert loaded.history == pckl.history
+    with pytest.raises(ValueError):
+        io.save_physio(tmpdir.join("bad").strpath, pckl, compression=10)
+
+    if compression in io.CODECS:
+        # files of format version 2 wrap the compressed data in a uint8 array
+        with np.load(out) as src:
+            arrays = {name: src[name] for name in src.files if name != "data"}
+        arrays["format_version"] = np.array(2)
+        with io._open_phys_data(out, compression) as fp:
+            raw = fp.read()
+        if compression == "lz4":
+            import lz4.frame
+
+            raw = lz4.frame.compress(raw)
+        else:
+            import zstandard
+
+            raw = zstandard.ZstdCompressor().compress(raw)
+        arrays["data"] = np.frombuffer(raw, dtype=np.uint8)
+        with open(tmpdir.join("v2.phys").strpath, "wb") as dest:
+            io._savez(dest, arrays)
+        assert np.array_equal(io.load_physio(dest.name).data, pckl.data)
+
+
+@pytest.mark.parametrize("compression", [True, "zstd"])
+def test_load_physio_lazy(tmpdir, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    pckl = io.load_physio(get_test_data_path("ECG.phys"), allow_pickle=True)
+    out = io.save_physio(tmpdir.join("tmp").strpath, pckl, compression=compression)
+    lazy = io.load_physio(out, allow_pickle=True, lazy=True)
+    assert isinstance(lazy._data, physio._LazyData)
+    assert len(lazy) == 44611
+    assert str(lazy) == "Physio(size=44611, fs=1000.0)"
+    assert lazy.history == pckl.history
+    assert isinstance(lazy._data, physio._LazyData)
+    assert np.array_equal(lazy.data, pckl.data)
+    assert isinstance(lazy._data, np.ndarray)
+
+
 def test_load_history(tmpdir):
     # get paths of data, new history
     fname = get_test_data_path("ECG.csv")
@@ -113,6 +346,86 @@ def test_load_history(tmpdir):
     assert filt.fs == replayed.fs
 
 
+def test_load_history_array_store(tmpdir, caplog):
+    fname = get_test_data_path("ECG.csv")
+    store_dir = tmpdir.join("store").strpath
+    phys = io.load_physio(fname, fs=1000.0)
+    weights = np.linspace(0, 1, phys.data.size)
+
+    # large arrays are recorded by reference, small ones as lists
+    previous = physio.set_history_store(store_dir)
+    try:
+        weighted = weight_physio(phys, weights)
+    finally:
+        physio.set_history_store(previous)
+    ref = weighted.history[-1][1]["weights"]
+    assert ref["shape"] == [phys.data.size]
+    assert os.path.isfile(os.path.join(store_dir, ref["__ndarray__"] + ".npy"))
+    assert physio._to_history_value(weights[:10]) == weights[:10].tolist()
+
+    # without a store, the data of referenced arrays is lost: warn about it,
+    # once per array
+    weight_physio(phys, weights)
+    weight_physio(phys, weights)
+    assert caplog.text.count("by reference only") == 1
+
+    path = io.save_history(tmpdir.join("tmp").strpath, weighted)
+    with pytest.raises(FileNotFoundError):
+        io.load_history(path)
+    replayed = io.load_history(path, store_dir=store_dir)
+    assert np.allclose(weighted, replayed)
+    assert weighted.history == replayed.history
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_load_histories(tmpdir, use_processes):
+    phys = io.load_physio(get_test_data_path("ECG.csv"), fs=1000.0)
+    files, expected = [], {}
+    for n, cutoff in enumerate([10.0, 20.0]):
+        filt = filter_physio(phys, cutoff, "lowpass")
+        files.append(io.save_history(tmpdir.join(f"history{n}").strpath, filt))
+        expected[files[-1]] = filt
+    files.append(tmpdir.join("missing.json").strpath)
+
+    results = list(io.load_histories(files, n_jobs=2, use_processes=use_processes))
+    assert sorted(file for file, _, _ in results) == sorted(files)
+    for file, replayed, error in results:
+        if file in expected:
+            assert error is None
+            assert np.allclose(replayed, expected[file])
+            assert replayed.history == expected[file].history
+        else:
+            assert replayed is None and isinstance(error, FileNotFoundError)
+
+    out_dir = tmpdir.join("out").strpath
+    for file, fname, error in io.load_histories(
+        files[:2], n_jobs=2, use_processes=use_processes, out_dir=out_dir
+    ):
+        assert fname == os.path.join(out_dir, os.path.basename(file)[:-5] + ".phys")
+        assert np.allclose(io.load_physio(fname), expected[file])
+
+    # histories with the same name in different directories do not clash
+    nested = []
+    for sub in ["sub-01", "sub-02"]:
+        nested.append(tmpdir.join(sub, "history.json").strpath)
+        os.makedirs(os.path.dirname(nested[-1]))
+        with open(files[0]) as src, open(nested[-1], "w") as dest:
+            dest.write(src.read())
+    nested.append(tmpdir.join("sub-01", "history.txt").strpath)
+    with open(files[0]) as src, open(nested[-1], "w") as dest:
+        dest.write(src.read())
+    results = {
+        file: (fname, error)
+        for file, fname, error in io.load_histories(
+            nested, use_processes=use_processes, out_dir=out_dir
+        )
+    }
+    assert results[nested[0]] == (os.path.join(out_dir, "sub-01", "history.phys"), None)
+    assert results[nested[1]] == (os.path.join(out_dir, "sub-02", "history.phys"), None)
+    assert results[nested[2]][0] is None
+    assert isinstance(results[nested[2]][1], ValueError)
+
+
 def test_save_history(tmpdir, caplog):
     # get paths of data, original history, new history
     fname = get_test_data_path("ECG.csv")
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import json
+import pickle
+import threading
+
 import numpy as np
 import pytest
 
+from physutils import physio
 from physutils.physio import Physio
 from physutils.tests import utils as testutils
+from physutils.tests.utils import filter_physio
 
 DATA = np.loadtxt(testutils.get_test_data_path("ECG.csv"))
 PROPERTIES = ["data", "fs", "history", "peaks", "troughs", "_masked"]
@@ -47,3 +53,157 @@ class TestPhysio:
                     assert hasattr(phys, prop)
                 for prop in ["peaks", "reject", "troughs"]:
                     assert isinstance(phys._metadata.get(prop), np.ndarray)
+
+
+def test_physio_peaks_cache():
+    phys = Physio(DATA, fs=1000, metadata=dict(peaks=[10, 20, 30]))
+    assert np.array_equal(phys.peaks, [10, 20, 30])
+    assert phys.peaks is phys.peaks
+    assert not phys.peaks.flags.writeable
+
+    # setting metadata entries or the whole metadata invalidates the cache
+    phys._metadata["reject"] = np.array([20])
+    assert np.array_equal(phys.peaks, [10, 30])
+    assert np.array_equal(phys._masked.mask, [False, True, False])
+    phys._metadata = dict(peaks=np.array([5]), reject=np.array([], dtype=int))
+    assert np.array_equal(phys.peaks, [5])
+
+    # in-place merges and copies go through the same checks
+    phys._metadata = dict(
+        peaks=np.array([5, 50, 80]), reject=np.array([], dtype=int), troughs=[]
+    )
+    assert np.array_equal(phys.peaks, [5, 50, 80])
+    phys._metadata |= {"reject": np.array([50])}
+    assert np.array_equal(phys.peaks, [5, 80])
+    copied = phys._metadata.copy()
+    assert type(copied) is type(phys._metadata) and copied == phys._metadata
+    copied["reject"] = [80]
+    assert np.array_equal(phys.peaks, [5, 80])
+
+    # plain arrays stored bypassing _Metadata do not break peaks
+    dict.__setitem__(phys._metadata, "reject", np.array([5]))
+    phys._metadata["troughs"] = []
+    assert np.array_equal(phys.peaks, [50, 80])
+    assert np.array_equal(phys._masked.mask, [True, False, False])
+
+
+def _call_with_args(data, a, *args, b=2, **kwargs):
+    return physio._get_call(exclude=["data"])
+
+
+def test_get_call():
+    name, provided = _call_with_args(DATA, np.arange(2), 3, b=4, c=5)
+    assert name == "physutils.tests.test_physio._call_with_args"
+    assert provided == dict(a=[0, 1], b=4)
+
+
+def test_history():
+    entries = [("load", {"a": 1}), ("filter", {"b": 2})]
+    history = physio.History(entries)
+    assert history == entries and list(history) == entries
+    assert len(history) == 2 and history[0] == entries[0] and history[-1] == entries[1]
+    assert history[::-1] == entries[::-1]
+    with pytest.raises(IndexError):
+        history[2]
+
+    # adding entries returns a new history, sharing the original one
+    longer = history + [("peaks", {})]
+    assert longer._parent is history and history == entries
+    assert longer == entries + [("peaks", {})]
+    assert pickle.loads(pickle.dumps(longer)) == longer
+
+    # derived Physio objects share history
+    phys = Physio(DATA, fs=1000, history=entries)
+    derived = physio.new_physio_like(phys, phys.data)
+    derived._history += [("peaks", {})]
+    assert derived._history._parent is phys._history
+    assert phys.history == entries
+
+    # but history is exposed as a list
+    assert json.loads(json.dumps(derived.history)) == [
+        list(entry) for entry in entries + [("peaks", {})]
+    ]
+    derived.history.append(("troughs", {}))
+    assert derived._history[-1] == ("troughs", {})
+    assert len(filter_physio(derived, 10, "lowpass").history) == 5
+    assert phys.history == entries
+
+
+def test_disable_history():
+    phys = Physio(DATA, fs=1000)
+    with physio.disable_history():
+        assert len(filter_physio(phys, 10, "lowpass").history) == 0
+    assert len(filter_physio(phys, 10, "lowpass").history) == 1
+
+    # the setting does not leak to other threads
+    lengths = []
+    with physio.disable_history():
+        thread = threading.Thread(
+            target=lambda: lengths.append(
+                len(filter_physio(phys, 10, "lowpass").history)
+            )
+        )
+        thread.start()
+        thread.join()
+    assert lengths == [1]
+
+
+def test_new_physio_like_copy():
+    phys = Physio(DATA.copy(), fs=1000)
+    assert not np.may_share_memory(physio.new_physio_like(phys, phys.data), phys.data)
+
+    # shared buffers are read-only in the new object only
+    shared = physio.new_physio_like(phys, phys.data, copy=False)
+    assert np.shares_memory(shared.data, phys.data)
+    assert not shared.data.flags.writeable and phys.data.flags.writeable
+    with pytest.raises(ValueError):
+        shared.data[0] = 0
+
+    # 'auto' reuses fresh arrays only
+    result = phys.data * 2
+    assert np.shares_memory(physio.new_physio_like(phys, result, copy="auto"), result)
+    assert not np.may_share_memory(
+        physio.new_physio_like(phys, phys.data[::2], copy="auto"), phys.data
+    )
+
+    # objects given to check_physio are copied, files just loaded are not
+    checked = physio.check_physio(phys, copy="auto")
+    assert checked is not phys and not np.may_share_memory(checked.data, phys.data)
+    phys.data[0] = 1
+    assert checked.data[0] != 1
+    fname = testutils.get_test_data_path("ECG.csv")
+    loaded = physio.check_physio(fname, ensure_fs=False, copy="auto")
+    assert loaded.data.flags.writeable
+
+
+def test_window_physio():
+    phys = Physio(
+        DATA.copy(),
+        fs=1000,
+        metadata=dict(peaks=[100, 1500, 2500, 4000], reject=[2500], troughs=[2000]),
+        suppdata=np.arange(DATA.size),
+    )
+    window = phys.window(1.0, 3.0, seconds=True)
+    assert window.fs == phys.fs and len(window) == 2000
+    assert np.shares_memory(window.data, phys.data)
+    assert np.array_equal(window.data, phys.data[1000:3000])
+    assert np.array_equal(window.peaks, [500])
+    assert np.array_equal(window._metadata["peaks"], [500, 1500])
+    assert np.array_equal(window.troughs, [1000])
+    assert np.array_equal(window.suppdata, np.arange(1000, 3000))
+    assert window.history[-1] == (
+        "physutils.physio.window_physio",
+        dict(seconds=True, start=1.0, stop=3.0),
+    )
+
+    # only the window is read-only
+    assert not window.data.flags.writeable
+    phys.data[1000] = -1
+    assert window.data[0] == -1
+
+    # events stored bypassing _Metadata are windowed too
+    dict.__setitem__(phys._metadata, "peaks", np.array([1500, 100]))
+    assert np.array_equal(phys.window(1000, 3000)._metadata["peaks"], [500])
+
+    assert np.array_equal(physio.window_physio(phys, -10).data, phys.data[-10:])
+    assert len(phys.window(3000, 1000)) == 0
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+import numpy as np
+import pytest
+
+from physutils import PhysioSet, io
+from physutils.physio import Physio
+from physutils.tests.utils import create_random_bids_structure
+
+DATA = np.random.rand(3, 1000)
+CHANNELS = ["cardiac", "respiratory", "trigger"]
+
+
+def test_physioset():
+    physioset = PhysioSet(
+        DATA,
+        CHANNELS,
+        fs=100,
+        history=[("load", {})],
+        metadata=[dict(peaks=[10, 20]), None, None],
+        physio_types=["cardiac", "respiratory", None],
+        label="test",
+    )
+    assert str(physioset) == (
+        "PhysioSet(channels=['cardiac', 'respiratory', 'trigger'], size=1000, "
+        "fs=100.0)"
+    )
+    assert list(physioset) == CHANNELS and len(physioset) == 3
+    assert np.array_equal(np.asarray(physioset).mean(axis=1), DATA.mean(axis=1))
+    assert not physioset.data.flags.writeable
+
+    # channels are Physio objects backed by views of the data
+    cardiac = physioset["cardiac"]
+    assert isinstance(cardiac, Physio) and cardiac is physioset[0]
+    assert np.shares_memory(cardiac.data, physioset.data)
+    assert np.array_equal(cardiac.peaks, [10, 20])
+    assert cardiac.fs == 100 and cardiac.physio_type == "cardiac"
+    assert cardiac.history == physioset.history == [("load", {})]
+    with pytest.raises(KeyError):
+        physioset["ecg"]
+
+    new = physioset.new_like(DATA * 2, history=[("double", {})])
+    assert np.array_equal(new.data, DATA * 2)
+    assert new.history == [("load", {}), ("double", {})]
+    assert np.array_equal(new["cardiac"].peaks, [10, 20])
+
+    stacked = PhysioSet.from_physio(physioset.to_dict())
+    assert np.array_equal(stacked.data, DATA) and stacked.channels == CHANNELS
+    with pytest.raises(ValueError):
+        PhysioSet(DATA, CHANNELS[:2])
+
+    # pickling stores the data once, and channels view it again after loading
+    pickled = pickle.dumps(physioset)
+    assert len(pickled) < 1.2 * DATA.nbytes
+    loaded = pickle.loads(pickled)
+    assert np.array_equal(loaded.data, DATA) and loaded.channels == CHANNELS
+    assert np.shares_memory(loaded["respiratory"].data, loaded.data)
+    assert np.array_equal(loaded["cardiac"].peaks, [10, 20])
+    assert loaded.history == physioset.history and loaded.label == "test"
+
+
+def test_load_from_bids_as_set():
+    create_random_bids_structure("physutils/tests/data")
+    kwargs = dict(subject="01", session="01", task="rest", run="01")
+    objects = io.load_from_bids("physutils/tests/data/bids-dir", **kwargs)
+    physioset = io.load_from_bids(
+        "physutils/tests/data/bids-dir", as_set=True, **kwargs
+    )
+    assert isinstance(physioset, PhysioSet)
+    assert physioset.channels == list(objects)
+    assert physioset.data.flags.c_contiguous
+    for col, phys in objects.items():
+        assert np.array_equal(physioset[col].data, phys.data)
+        assert physioset[col].physio_type == phys.physio_type
+    assert physioset.history[0][1]["as_set"] is True
+
+    # no selected column gives an empty set, as it gives no Physio object
+    empty = io._make_bids_physioset(
+        "sub-01_physio.tsv.gz", {}, ["time", "cardiac"], [], 0, 100.0, ("load", {})
+    )
+    assert len(empty) == 0 and empty.data.shape == (0, 0)
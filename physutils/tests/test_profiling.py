@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+
+from physutils import physio
+from physutils.profiling import profile_operations
+from physutils.tests.utils import filter_physio, weight_physio
+
+DATA = np.random.rand(10000)
+
+
+def test_profile_operations():
+    phys = physio.Physio(DATA, fs=1000, label="test")
+    with profile_operations() as profile:
+        filtered = filter_physio(phys, [5.0, 15.0], "bandpass")
+        weight_physio(filtered, DATA)
+        weight_physio(filtered, DATA)
+    filter_physio(phys, 10, "lowpass")
+
+    assert len(profile.records) == 3
+    record = profile.records[0]
+    assert record["operation"] == "physutils.tests.utils.filter_physio"
+    assert record["label"] == "test" and record["step"] == 0
+    assert record["wall_time"] > 0 and record["peak_memory"] >= DATA.nbytes
+
+    report = profile.report()
+    assert report["physutils.tests.utils.weight_physio"]["calls"] == 2
+    assert "weight_physio" in str(profile)
+
+    with profile_operations(trace_memory=False) as profile:
+        filter_physio(phys, 10, "lowpass")
+    assert profile.records[0]["peak_memory"] is None
+
+    # operations run by other threads are not recorded
+    with profile_operations(trace_memory=False) as profile:
+        thread = threading.Thread(target=filter_physio, args=(phys, 10, "lowpass"))
+        thread.start()
+        thread.join()
+    assert len(profile.records) == 0
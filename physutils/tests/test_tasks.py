@@ -5,6 +5,7 @@ import os
 import physutils.tasks as tasks
 from physutils import physio
 from physutils.tests.utils import create_random_bids_structure
+from physutils.utils import is_bids_directory
 
 
 def test_generate_physio_phys_file():
@@ -105,3 +106,14 @@ def test_generate_physio_auto_error(caplog):
             )
             == 1
         )
+
+
+def test_is_bids_directory(caplog):
+    create_random_bids_structure("physutils/tests/data")
+    bids_dir = os.path.abspath("physutils/tests/data/bids-dir")
+    assert is_bids_directory(bids_dir)
+    assert is_bids_directory(bids_dir, full=True)
+
+    non_bids_dir = os.path.abspath("physutils/tests/data/non-bids-dir")
+    assert not is_bids_directory(non_bids_dir)
+    assert caplog.text.count("dataset_description.json' is missing") == 1
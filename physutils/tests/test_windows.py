@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from physutils import windows
+from physutils.physio import Physio
+
+DATA = np.arange(1000.0)
+PEAKS = [50, 150, 250, 720, 990]
+
+
+def test_sliding_windows():
+    phys = Physio(DATA, fs=100, metadata=dict(peaks=PEAKS, reject=[150]))
+    wins = phys.sliding_windows(2.0, 1.0, seconds=True)
+    assert np.array_equal(wins.starts, np.arange(0, 801, 100))
+    assert wins.data.shape == (9, 200) and not wins.data.flags.writeable
+    assert np.shares_memory(wins.data, phys.data)
+    assert np.array_equal(wins.data[3], DATA[300:500])
+    assert np.array_equal(wins.events[slice(*wins.bounds[0])], [50])
+    assert np.array_equal(wins.events[slice(*wins.bounds[2])], [250])
+    assert np.array_equal(np.diff(wins.bounds).ravel(), [1, 1, 1, 0, 0, 0, 1, 1, 1])
+
+    troughs = windows.sliding_windows(phys, 500, events="reject")
+    assert np.array_equal(troughs.events[slice(*troughs.bounds[0])], [150])
+    assert windows.sliding_windows(phys, 2000).data.shape == (0, 2000)
+    with pytest.raises(ValueError):
+        windows.sliding_windows(phys, 0)
+    with pytest.raises(ValueError):
+        windows.sliding_windows(phys, 10, events="spikes")
+
+
+def test_iter_windows():
+    phys = Physio(DATA, fs=100, metadata=dict(peaks=PEAKS))
+    wins = list(phys.iter_windows(400))
+    assert [start for start, _, _ in wins] == [0, 400]
+    assert np.array_equal(wins[1][1], DATA[400:800])
+    assert np.array_equal(wins[0][2], [50, 150, 250])
+    assert np.array_equal(wins[1][2], [320])
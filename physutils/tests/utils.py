@@ -11,7 +11,7 @@ import pandas as pd
 from pkg_resources import resource_filename
 from scipy import signal
 
-from physutils import physio
+from physutils import physio, utils
 
 
 def get_test_data_path(fname=None):
@@ -82,6 +82,28 @@ def filter_physio(data, cutoffs, method, *, order=3):
     return filtered
 
 
+@physio.make_operation()
+def weight_physio(data, weights):
+    """
+    Multiplies `data` by `weights`, sample by sample
+
+    Parameters
+    ----------
+    data : Physio_like
+        Input physiological data
+    weights : array_like
+        Weights, with the same length as `data`
+
+    Returns
+    -------
+    weighted : :class:`peakdet.Physio`
+        Weighted input `data`
+    """
+
+    data = physio.check_physio(data, ensure_fs=False)
+    return physio.new_physio_like(data, data.data * np.asarray(weights))
+
+
 def create_random_bids_structure(data_dir, recording_id=None):
 
     dataset_description = {
@@ -167,4 +189,6 @@ def create_random_bids_structure(data_dir, recording_id=None):
         compression="gzip",
     )
 
+    # files were added below the dataset root, which cached layouts miss
+    utils.clear_bids_layouts()
     return bids_dir
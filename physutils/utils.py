@@ -3,14 +3,31 @@
 
 """Helper class for holding physiological data and associated metadata information."""
 
+import json
 import logging
+import os
+import os.path as op
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from functools import wraps
+from itertools import islice
 
+import numpy as np
 from loguru import logger
 
 LGR = logging.getLogger(__name__)
 LGR.setLevel(logging.DEBUG)
 
+_LAYOUTS = {}
+# permissions of files created by mkstemp are restricted; use the default ones
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
 
 def task(func):
     """
@@ -36,19 +53,126 @@ def task(func):
     return wrapper
 
 
-def is_bids_directory(path_to_dir):
+def iter_completed(func, items, n_jobs=1, use_processes=False, initializer=None):
     """
-    Check if a directory is a BIDS compliant directory.
+    Run `func` on each of `items` in a pool, yielding futures as they complete.
+
+    At most ``2 * n_jobs`` items are submitted at any time, so that results
+    that were not consumed yet do not accumulate in memory.
 
     Parameters
     ----------
-    path_to_dir : os.path or str
-        Path to (supposed) BIDS directory
+    func : callable
+        Function to call on each item. Must be picklable if `use_processes`.
+    items : iterable
+        Items to process
+    n_jobs : int, optional
+        Number of workers. Default: 1
+    use_processes : bool, optional
+        Whether to use a pool of processes instead of threads. Default: False
+    initializer : callable, optional
+        Function called once when each worker starts. Default: None
+
+    Yields
+    ------
+    item : object
+        Processed item
+    future : :class:`concurrent.futures.Future`
+        Completed future holding the result of ``func(item)``, or the raised
+        exception
+    """
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    items = iter(items)
+    with executor(max_workers=n_jobs, initializer=initializer) as pool:
+        pending = {pool.submit(func, item): item for item in islice(items, 2 * n_jobs)}
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for item in islice(items, 1):
+                    pending[pool.submit(func, item)] = item
+                yield pending.pop(future), future
+
+
+def make_temp_path(path, directory=False):
+    """
+    Creates a uniquely named temporary file or directory next to `path`
+
+    Writing to it and then moving it to `path` with :func:`os.replace` makes
+    the write atomic: concurrent readers never see partially written data,
+    and concurrent writers of the same `path` do not share temporary files.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        Final path of the file or directory
+    directory : bool, optional
+        Whether to create a directory instead of a file. Default: False
 
     Returns
     -------
-    bool
-        True if the given path is a BIDS directory, False is not.
+    tmp_path : str
+        Path to the created file or directory, with default permissions
+    """
+    parent, name = op.split(op.abspath(os.fspath(path)))
+    if directory:
+        tmp_path = tempfile.mkdtemp(prefix=name + ".", suffix=".tmp", dir=parent)
+        os.chmod(tmp_path, 0o777 & ~_UMASK)
+    else:
+        fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=parent)
+        os.close(fd)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+    return tmp_path
+
+
+def save_npy_atomic(fname, array):
+    """
+    Saves `array` to .npy file `fname` atomically (see :func:`make_temp_path`)
+
+    Parameters
+    ----------
+    fname : str or os.PathLike
+        Path to .npy file
+    array : array_like
+        Array to be saved
+    """
+    tmp_path = make_temp_path(fname)
+    try:
+        with open(tmp_path, "wb") as dest:
+            np.save(dest, array)
+        os.replace(tmp_path, fname)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def get_bids_layout(bids_path, validate=False, database_path=None, reset=False):
+    """
+    Returns the BIDSLayout of `bids_path`, indexing it only on first request.
+
+    Layouts are cached in memory for the lifetime of the interpreter, and are
+    only rebuilt if the modification time of `bids_path` itself changed (e.g.,
+    when a subject directory is added or removed). Files added or removed
+    deeper in the dataset are not detected: pass `reset=True` or call
+    :func:`clear_bids_layouts` then.
+
+    Parameters
+    ----------
+    bids_path : os.path or str
+        Path to BIDS directory
+    validate : bool, optional
+        Whether to validate files against the BIDS specification while
+        indexing. Default: False
+    database_path : os.path or str, optional
+        Path to a SQLite database in which pybids persists the index, so that
+        other processes (or later sessions) can reuse it. Default: None
+    reset : bool, optional
+        Whether to index `bids_path` again even if it is already cached.
+        Default: False
+
+    Returns
+    -------
+    layout : :class:`bids.BIDSLayout`
+        Index of `bids_path`
     """
     try:
         from bids import BIDSLayout
@@ -56,13 +180,81 @@ def is_bids_directory(path_to_dir):
         raise ImportError(
             "To use BIDS-based feature, pybids must be installed. Install manually or with `pip install physutils[bids]`"
         )
-    try:
-        # Attempt to create a BIDSLayout object
-        _ = BIDSLayout(path_to_dir)
-        return True
-    except Exception as e:
-        # Catch other exceptions that might indicate the directory isn't BIDS compliant
+    key = (op.abspath(os.fspath(bids_path)), validate)
+    mtime = os.stat(key[0]).st_mtime_ns
+    if reset or key not in _LAYOUTS or _LAYOUTS[key][0] != mtime:
+        logger.debug(f"Indexing BIDS directory {bids_path}")
+        _LAYOUTS[key] = (
+            mtime,
+            BIDSLayout(
+                bids_path,
+                validate=validate,
+                database_path=database_path,
+                reset_database=reset,
+            ),
+        )
+    return _LAYOUTS[key][1]
+
+
+def clear_bids_layouts():
+    """Clear the cache of BIDSLayout objects built by :func:`get_bids_layout`."""
+    _LAYOUTS.clear()
+
+
+def is_bids_directory(path_to_dir, full=False):
+    """
+    Check if a directory is a BIDS compliant directory.
+
+    By default, only the structure of the dataset root is checked: it must
+    contain a readable dataset_description.json and at least one sub-*
+    directory. This does not walk the whole tree, and is therefore cheap even
+    on large datasets.
+
+    Parameters
+    ----------
+    path_to_dir : os.path or str
+        Path to (supposed) BIDS directory
+    full : bool, optional
+        Whether to index the full dataset with pybids instead, which also
+        catches errors deeper in the tree. Default: False
+
+    Returns
+    -------
+    bool
+        True if the given path is a BIDS directory, False is not.
+    """
+    if full:
+        try:
+            # Attempt to create a BIDSLayout object
+            _ = get_bids_layout(path_to_dir, validate=True)
+            return True
+        except Exception as e:
+            # Catch other exceptions that might indicate the directory isn't BIDS compliant
+            logger.error(
+                f"An error occurred while trying to load {path_to_dir} as a BIDS Layout object: {e}"
+            )
+            return False
+
+    if not op.isdir(path_to_dir):
+        logger.error(f"{path_to_dir} is not a directory")
+        return False
+    description = op.join(path_to_dir, "dataset_description.json")
+    if not op.isfile(description):
         logger.error(
-            f"An error occurred while trying to load {path_to_dir} as a BIDS Layout object: {e}"
+            f"{path_to_dir} is not a BIDS directory: 'dataset_description.json' is "
+            "missing from project root. Every valid BIDS dataset must have this file."
         )
         return False
+    try:
+        with open(description, "r") as src:
+            json.load(src)
+    except ValueError as e:
+        logger.error(f"{description} is not a valid JSON file: {e}")
+        return False
+    if not any(
+        entry.is_dir() and entry.name.startswith("sub-")
+        for entry in os.scandir(path_to_dir)
+    ):
+        logger.error(f"{path_to_dir} is not a BIDS directory: no sub-* folder found")
+        return False
+    return True
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Sliding windows over physiological data, for windowed (e.g., HRV) metrics
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from physutils.physio import EVENT_KEYS, check_physio
+
+Windows = namedtuple("Windows", ["starts", "data", "events", "bounds"])
+Windows.__doc__ = """\
+Sliding windows over physiological data
+
+Attributes
+----------
+starts : :obj:`numpy.ndarray`
+    Index of the first sample of each window, shape (n_windows,)
+data : :obj:`numpy.ndarray`
+    Read-only view of the data of the windows, shape (n_windows, size)
+events : :obj:`numpy.ndarray`
+    Indices of the requested events in the whole data
+bounds : :obj:`numpy.ndarray`
+    Range of `events` falling in each window, shape (n_windows, 2): the events
+    of window `i` are ``events[bounds[i, 0]:bounds[i, 1]]``
+"""
+
+
+def _get_window_samples(data, size, step, seconds):
+    """Converts window `size` and `step` to samples, checking them."""
+    step = size if step is None else step
+    if seconds:
+        size, step = int(round(size * data.fs)), int(round(step * data.fs))
+    if size < 1 or step < 1:
+        raise ValueError(
+            f"Window size {size} and step {step} must be at least one sample."
+        )
+    return size, step
+
+
+def _get_events(data, events):
+    """Returns the events of `data` named `events`."""
+    if events == "peaks":
+        return data.peaks
+    if events in EVENT_KEYS:
+        return data._metadata[events]
+    raise ValueError(
+        f"Provided events {events} are not supported; must be in {EVENT_KEYS}."
+    )
+
+
+def sliding_windows(data, size, step=None, *, seconds=False, events="peaks"):
+    """
+    Returns all sliding windows of `data`, stacked without copying the data
+
+    The windows are a strided view of the data, so metrics can be computed on
+    all of them at once (e.g., ``windows.data.std(axis=1)``). Windows that
+    would extend past the end of `data` are dropped.
+
+    Parameters
+    ----------
+    data : Physio_like
+        Input physiological data
+    size : int or float
+        Length of each window, in samples or seconds
+    step : int or float, optional
+        Distance between the starts of consecutive windows, in samples or
+        seconds. Default: None (`size`, i.e., non-overlapping windows)
+    seconds : bool, optional
+        Whether `size` and `step` are in seconds instead of samples. Default:
+        False
+    events : {'peaks', 'troughs', 'reject'}, optional
+        Events to find in each window. 'peaks' excludes rejected peaks.
+        Default: 'peaks'
+
+    Returns
+    -------
+    windows : :class:`Windows`
+        Start, data and events of the windows
+    """
+
+    data = check_physio(data, ensure_fs=seconds)
+    size, step = _get_window_samples(data, size, step, seconds)
+    events = _get_events(data, events)
+
+    if len(data) < size:
+        windows = np.empty((0, size), dtype=data.data.dtype)
+    else:
+        windows = sliding_window_view(data.data, size)[::step]
+    starts = np.arange(windows.shape[0]) * step
+    bounds = np.column_stack(
+        [np.searchsorted(events, starts), np.searchsorted(events, starts + size)]
+    )
+
+    return Windows(starts, windows, events, bounds)
+
+
+def iter_windows(data, size, step=None, *, seconds=False, events="peaks"):
+    """
+    Yields sliding windows of `data` with the events falling in each of them
+
+    Parameters
+    ----------
+    data : Physio_like
+        Input physiological data
+    size, step, seconds, events : optional
+        See :func:`sliding_windows`
+
+    Yields
+    ------
+    start : int
+        Index of the first sample of the window
+    window : :obj:`numpy.ndarray`
+        Read-only view of the data of the window
+    window_events : :obj:`numpy.ndarray`
+        Events in the window, relative to `start`
+    """
+
+    windows = sliding_windows(data, size, step, seconds=seconds, events=events)
+    for start, window, (lo, hi) in zip(windows.starts, windows.data, windows.bounds):
+        yield int(start), window, windows.events[lo:hi] - start